@@ -0,0 +1,73 @@
+"""
+Screenshot upload + presigned URL against moto's in-process S3: a new
+boto3 client/resource per call (as before) versus AmazoneCloudService
+with cached client.
+
+    $ python -m benchmarks.bench_amazon_service --uploads 200
+"""
+import argparse
+import base64
+import os
+import time
+
+import boto3
+
+from benchmarks.config import use_config
+
+try:
+    from moto import mock_aws
+except ImportError:  # moto < 5
+    from moto import mock_s3 as mock_aws
+
+BUCKET = 'benchmark'
+IMAGE = base64.b64encode(os.urandom(64 * 1024))
+
+
+def legacy_upload(key):
+    resource = boto3.resource('s3', aws_access_key_id='testing',
+                              aws_secret_access_key='testing')
+    resource.Bucket(BUCKET).put_object(Key=key,
+                                       Body=base64.b64decode(IMAGE),
+                                       ContentType='image/png')
+    client = boto3.client('s3', aws_access_key_id='testing',
+                          aws_secret_access_key='testing')
+    client.generate_presigned_url('get_object',
+                                  Params={'Bucket': BUCKET, 'Key': key},
+                                  ExpiresIn=3600)
+
+
+def measure(upload, uploads):
+    started = time.perf_counter()
+    for i in range(uploads):
+        upload('screenshots/{}.png'.format(i))
+    return (time.perf_counter() - started) / uploads * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--uploads', type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    use_config(aws_screen_shot_bucket=BUCKET)
+    from pytest_zafira.services.amazon_service import AmazoneCloudService
+
+    with mock_aws():
+        boto3.client('s3').create_bucket(Bucket=BUCKET)
+        before = measure(legacy_upload, args.uploads)
+
+        service = AmazoneCloudService()
+
+        def cached_upload(key):
+            service.upload_image_from_base64(IMAGE, key)
+            service.generate_amazon_presigned_URL(key, 3600)
+
+        after = measure(cached_upload, args.uploads)
+
+    print('uploads: {}'.format(args.uploads))
+    print('client per call: {:.2f} ms/upload'.format(before))
+    print('cached client:   {:.2f} ms/upload'.format(after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Per-call latency of APIRequest against a local Zafira stub: a new
+connection per call (module-level requests.post, as before) versus
+the pooled keep-alive session.
+
+    $ python -m benchmarks.bench_api_request --calls 2000
+"""
+import argparse
+import time
+
+import requests
+
+from benchmarks.config import use_config
+from benchmarks.stub_server import ZafiraStubServer
+
+BODY = {'testClass': 'TestClass', 'testMethod': 'test_method',
+        'testSuiteId': 1, 'primaryOwnerId': 1}
+
+
+def measure(call, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        call()
+    return (time.perf_counter() - started) / calls * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+
+    with ZafiraStubServer() as stub:
+        use_config(**{'service-url': stub.url})
+        from pytest_zafira.api.api_request import APIRequest
+
+        url = stub.url + '/api/tests/cases'
+        before = measure(lambda: requests.post(url, json=BODY), args.calls)
+        before_connections = stub.connections
+
+        stub.reset()
+        api = APIRequest(stub.url)
+        after = measure(lambda: api.post('/api/tests/cases', BODY),
+                        args.calls)
+        after_connections = stub.connections
+        api.close()
+
+    print('calls: {}'.format(args.calls))
+    print('requests.post:     {:.3f} ms/call, {} connections'.format(
+        before, before_connections))
+    print('APIRequest.post:   {:.3f} ms/call, {} connections'.format(
+        after, after_connections))
+
+
+if __name__ == '__main__':
+    main()
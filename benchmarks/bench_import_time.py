@@ -0,0 +1,73 @@
+"""
+Import time of the plugin modules measured by python -X importtime in
+fresh interpreters. pytest itself is imported first, so only the cost
+added by the plugin is counted. Fails if the plugin imports boto3, pika,
+requests or aiohttp, which are needed only by enabled features.
+
+    $ python -m benchmarks.bench_import_time --runs 5 --max-ms 50
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.config import use_config
+
+PLUGIN_MODULES = ('pytest_zafira.zafira_plugin',
+                  'pytest_zafira.screenshot_plugin')
+HEAVY_MODULES = ('boto3', 'pika', 'requests', 'aiohttp')
+
+
+def measure(root):
+    """
+    :return: microseconds spent on plugin imports and names of all
+             imported top-level modules
+    """
+    code = 'import pytest; import {}'.format(', '.join(PLUGIN_MODULES))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [root, env.get('PYTHONPATH')])
+    )
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        env=env, stderr=subprocess.PIPE, universal_newlines=True, check=True
+    ).stderr
+
+    total = 0
+    modules = set()
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        modules.add(name.split('.')[0])
+        if name in PLUGIN_MODULES:
+            total += int(cumulative)
+    return total, modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='fail if median import time is bigger')
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    use_config()
+    results = [measure(root) for _ in range(args.runs)]
+    median = statistics.median(total for total, _ in results) / 1000
+    heavy = sorted(set(HEAVY_MODULES) & set.union(
+        *[modules for _, modules in results]
+    ))
+
+    print('runs: {}'.format(args.runs))
+    print('plugin import time: {:.1f} ms (median)'.format(median))
+    print('heavy modules imported: {}'.format(', '.join(heavy) or 'none'))
+    if heavy or (args.max_ms is not None and median > args.max_ms):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Throughput of LogstashFormatter compared to its previous implementation,
+which read configuration and rebuilt dicts for every record.
+
+    $ python -m benchmarks.bench_logstash_formatter --records 1000000
+"""
+import argparse
+import json
+import logging
+import time
+
+from benchmarks.config import use_config
+
+
+class LegacyLogstashFormatter(logging.Formatter):
+
+    def format(self, record):
+        from pytest_zafira.utils import Context
+        from pytest_zafira.constants import PARAMETER
+
+        message = {}
+        self.write_basic(message, record)
+        if Context.get(PARAMETER['S3_SAVE_SCREENSHOTS']) and\
+                'META_INFO' == record.levelname:
+            self.write_with_headers(message, record)
+        return bytes(json.dumps(message), 'utf-8')
+
+    def write_basic(self, message, record):
+        normalized = ''
+        for symb in record.threadName:
+            if symb.isupper():
+                normalized += symb
+        message.update({
+            'timestamp': time.time() * 1000,
+            'threadName': normalized,
+            'logger': record.name,
+            'message': record.msg,
+            'level': record.levelname
+        })
+
+    def write_with_headers(self, message, record):
+        message.update({'headers': {
+            'AMAZON_PATH': record.amazon_path,
+            'CI_TEST_ID': record.test_id,
+            'AMAZON_PATH_CORRELATION_ID': record.correlation_id
+        }})
+
+
+def measure(formatter, record, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        formatter.format(record)
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', type=int, default=1000000)
+    args = parser.parse_args()
+
+    use_config()
+    from pytest_zafira.services.logstash_formatter import (LogstashFormatter,
+                                                           JSON_BACKEND)
+
+    record = logging.LogRecord('zafira', logging.INFO, __file__, 1,
+                               'Opening page https://example.com/login',
+                               None, None)
+    legacy = measure(LegacyLogstashFormatter(), record, args.records)
+    current = measure(LogstashFormatter(), record, args.records)
+
+    print('records: {}, json backend: {}'.format(args.records,
+                                                 JSON_BACKEND))
+    print('legacy:  {:,.0f} records/sec'.format(legacy))
+    print('current: {:,.0f} records/sec ({:.1f}x)'.format(current,
+                                                          current / legacy))
+
+
+if __name__ == '__main__':
+    main()
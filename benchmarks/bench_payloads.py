@@ -0,0 +1,119 @@
+"""
+Construction and serialization throughput of immutable payloads compared
+to the previous approach of filling a shared module-level dict, and
+throughput of building payloads on several threads.
+
+    $ python -m benchmarks.bench_payloads --payloads 200000 --threads 4
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.config import use_config
+
+LEGACY_TEST = {
+    "artifacts": [],
+    "blocker": None,
+    "ciTestId": None,
+    "configXML": None,
+    "dependsOnMethods": None,
+    "finishTime": None,
+    "id": None,
+    "knownIssue": None,
+    "message": None,
+    "messageHashCode": None,
+    "name": "NAME",
+    "needRerun": None,
+    "retry": None,
+    "startTime": None,
+    "status": None,
+    "testArgs": None,
+    "testCaseId": "TEST_CASE_ID_INT",
+    "testClass": None,
+    "testGroup": None,
+    "testMetrics": None,
+    "testRunId": "TEST_RUN_ID_INT",
+    "workItems": []
+}
+
+
+def legacy_payload(i):
+    # copy is what a thread safe version of the old code had to do
+    test = dict(LEGACY_TEST)
+    test["testRunId"] = 1
+    test["testCaseId"] = i
+    test["name"] = 'test_{}'.format(i)
+    test["ciTestId"] = 'ci-{}'.format(i)
+    test["startTime"] = i
+    test["testClass"] = 'TestClass'
+    test["status"] = 'IN_PROGRESS'
+    test["workItems"] = None
+    test["testGroup"] = ''
+    return test
+
+
+def measure(build, serialize, count):
+    started = time.perf_counter()
+    payloads = [build(i) for i in range(count)]
+    built = time.perf_counter()
+    for payload in payloads:
+        serialize(payload)
+    finished = time.perf_counter()
+    return count / (built - started), count / (finished - built)
+
+
+def measure_threads(build, serialize, count, threads):
+    def work(start):
+        for i in range(start, count, threads):
+            serialize(build(i))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(work, range(threads)))
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--payloads', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    use_config()
+    from pytest_zafira.api.payloads import Test, to_json_ready
+    from pytest_zafira.utils.json_backend import JSON_BACKEND, dumps
+
+    def current_payload(i):
+        return Test(testRunId=1,
+                    testCaseId=i,
+                    name='test_{}'.format(i),
+                    ciTestId='ci-{}'.format(i),
+                    startTime=i,
+                    testClass='TestClass',
+                    status='IN_PROGRESS',
+                    workItems=None,
+                    testGroup='')
+
+    def legacy_serialize(payload):
+        # requests encodes json= bodies by json.dumps
+        return json.dumps(payload).encode('utf-8')
+
+    def current_serialize(payload):
+        return dumps(to_json_ready(payload))
+
+    count = args.payloads
+    print('payloads: {}, json backend: {}'.format(count, JSON_BACKEND))
+    for name, build, serialize in (
+            ('legacy', legacy_payload, legacy_serialize),
+            ('current', current_payload, current_serialize)):
+        construction, serialization = measure(build, serialize, count)
+        threaded = measure_threads(build, serialize, count, args.threads)
+        print('{:8} build {:>12,.0f}/sec  serialize {:>12,.0f}/sec  '
+              'both on {} threads {:>12,.0f}/sec'.format(
+                  name + ':', construction, serialization,
+                  args.threads, threaded))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""
+Synthetic suites of trivial tests run through the plugin against a local
+Zafira stub. Every size is run twice in fresh pytest processes: with
+zafira_enabled=False as baseline and with reporting, so the difference
+is wall time added by the plugin. Stub latency imitates a remote Zafira,
+S3 and RabbitMQ are replaced by in-process stand-ins (see
+synthetic_suite).
+
+Results can be appended to a JSON lines file, every run is compared with
+the last one of the same configuration, e.g. built from another commit:
+
+    $ python -m benchmarks.bench_plugin_suite --tests 1000 10000 50000 \\
+        --latency 5 --history bench_plugin_suite.jsonl
+    $ python -m benchmarks.bench_plugin_suite --pytest-arg=-n4 \\
+        --zafira-option reporting_mode=async --logs 10 --artifacts
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.config import use_config
+from benchmarks.stub_server import ZafiraStubServer
+from benchmarks.synthetic_suite import RABBITMQ_SETTINGS
+
+SUITE = '''import pytest
+
+
+@pytest.mark.parametrize('case', range({tests}))
+def test_synthetic(case):
+    assert {fail_every} == 0 or case % {fail_every} != {fail_every} - 1
+'''
+
+
+def git_commit(root):
+    """
+    :return: short hash of HEAD, with '-dirty' suffix if tree has changes
+    """
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=root,
+            stderr=subprocess.DEVNULL, universal_newlines=True
+        ).strip()
+        dirty = subprocess.call(['git', 'diff', '--quiet', 'HEAD'],
+                                cwd=root, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if dirty else '')
+
+
+def run_suite(root, directory, args, options):
+    """
+    Runs synthetic suite in a new pytest process
+    :return: dict with wall time, peak memory of the biggest process and
+             number of published log records
+    """
+    report = os.path.join(directory, 'report.json')
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [root, env.get('PYTHONPATH')])
+    )
+    env['BENCH_LOGS'] = str(args.logs)
+    env['BENCH_ARTIFACTS'] = '1' if args.artifacts else ''
+    env['BENCH_REPORT'] = report
+    command = [sys.executable, '-m', 'pytest', '-q', '-p',
+               'no:cacheprovider', '-p', 'pytest_zafira.zafira_plugin',
+               '-p', 'benchmarks.synthetic_suite'] + args.pytest_arg
+    for option in options:
+        command += ['--zafira-option', option]
+
+    started = time.perf_counter()
+    process = subprocess.run(command, cwd=directory, env=env,
+                             stdout=subprocess.PIPE,
+                             stderr=subprocess.STDOUT,
+                             universal_newlines=True)
+    seconds = time.perf_counter() - started
+    # exit code 1 means some synthetic tests failed, as they should
+    if process.returncode not in (0, 1) or not os.path.exists(report):
+        sys.exit('pytest exited with code {}:\n{}'.format(
+            process.returncode, process.stdout[-4000:]))
+    # reports of xdist workers are named report.json.gw0 and so on
+    reports = [os.path.join(directory, name)
+               for name in sorted(os.listdir(directory))
+               if name.startswith(os.path.basename(report))]
+    result = {'peak_rss_mb': None, 'published': 0}
+    for path in reports:
+        with open(path) as f:
+            process_result = json.load(f)
+        os.remove(path)
+        result['published'] += process_result['published']
+        result['peak_rss_mb'] = max(result['peak_rss_mb'] or 0,
+                                    process_result['peak_rss_mb'] or 0) \
+            or None
+    result['seconds'] = seconds
+    return result
+
+
+def measure(root, stub, tests, args):
+    directory = use_config(**{'service-url': stub.url,
+                              'zafira_app_url': stub.url})
+    with open(os.path.join(directory, 'test_synthetic.py'), 'w') as f:
+        f.write(SUITE.format(tests=tests, fail_every=args.fail_every))
+
+    baseline = run_suite(root, directory, args,
+                         args.zafira_option + ['zafira_enabled=False'])
+    stub.reset()
+    plugin = run_suite(root, directory, args, args.zafira_option)
+    return {
+        'tests': tests,
+        'baseline_seconds': baseline['seconds'],
+        'seconds': plugin['seconds'],
+        'added_ms_per_test':
+            (plugin['seconds'] - baseline['seconds']) / tests * 1000,
+        'requests_per_test': stub.requests / float(tests),
+        'connections': stub.connections,
+        'published_logs': plugin['published'],
+        'baseline_peak_rss_mb': baseline['peak_rss_mb'],
+        'peak_rss_mb': plugin['peak_rss_mb'],
+    }
+
+
+def configuration(args):
+    """
+    :return: options which make results comparable
+    """
+    return {'latency_ms': args.latency, 'logs': args.logs,
+            'artifacts': args.artifacts, 'fail_every': args.fail_every,
+            'zafira_options': args.zafira_option,
+            'pytest_args': args.pytest_arg}
+
+
+def load_history(path):
+    if not path or not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous_result(history, result):
+    for entry in reversed(history):
+        if entry['tests'] == result['tests'] and \
+                entry['configuration'] == result['configuration']:
+            return entry
+    return None
+
+
+def format_rss(value):
+    return '{:.1f}'.format(value) if value is not None else '-'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tests', type=int, nargs='+',
+                        default=[1000, 10000],
+                        help='suite sizes, e.g. 1000 10000 50000')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='milliseconds added to every stub response')
+    parser.add_argument('--logs', type=int, default=0,
+                        help='records logged by every test to RabbitMQ')
+    parser.add_argument('--artifacts', action='store_true',
+                        help='attach an artifact in S3 to every test, '
+                             'requires moto')
+    parser.add_argument('--fail-every', type=int, default=100,
+                        help='every n-th test fails, 0 for none')
+    parser.add_argument('--zafira-option', action='append', default=[],
+                        help='name=value passed to both runs')
+    parser.add_argument('--pytest-arg', action='append', default=[],
+                        help='e.g. --pytest-arg=-n4 with pytest-xdist')
+    parser.add_argument('--history', default=None,
+                        help='JSON lines file to append results to')
+    parser.add_argument('--max-added-ms', type=float, default=None,
+                        help='fail if plugin adds more per test')
+    args = parser.parse_args()
+    if args.history:
+        # benchmark changes working directory
+        args.history = os.path.abspath(args.history)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    commit = git_commit(root)
+    history = load_history(args.history)
+    results = []
+    settings = RABBITMQ_SETTINGS if args.logs else None
+    with ZafiraStubServer(args.latency / 1000, settings=settings) as stub:
+        for tests in args.tests:
+            result = measure(root, stub, tests, args)
+            result.update(commit=commit, timestamp=time.time(),
+                          configuration=configuration(args))
+            results.append(result)
+
+    print('commit: {}'.format(commit))
+    print('{:>7} {:>10} {:>9} {:>12} {:>13} {:>11} {:>11}'.format(
+        'tests', 'baseline s', 'plugin s', 'added ms/test', 'requests/test',
+        'base RSS MB', 'RSS MB'))
+    for result in results:
+        print('{:>7} {:>10.2f} {:>9.2f} {:>12.3f} {:>13.2f} {:>11} '
+              '{:>11}'.format(result['tests'], result['baseline_seconds'],
+                              result['seconds'],
+                              result['added_ms_per_test'],
+                              result['requests_per_test'],
+                              format_rss(result['baseline_peak_rss_mb']),
+                              format_rss(result['peak_rss_mb'])))
+        previous = previous_result(history, result)
+        if previous:
+            print('{:>7} {:>10.2f} {:>9.2f} {:>12.3f} {:>13.2f} {:>11} '
+                  '{:>11}  <- {}'.format(
+                      '', previous['baseline_seconds'],
+                      previous['seconds'], previous['added_ms_per_test'],
+                      previous['requests_per_test'],
+                      format_rss(previous['baseline_peak_rss_mb']),
+                      format_rss(previous['peak_rss_mb']),
+                      previous['commit']))
+
+    if args.history:
+        with open(args.history, 'a') as f:
+            for result in results:
+                f.write(json.dumps(result) + '\n')
+    if args.max_added_ms is not None and any(
+            result['added_ms_per_test'] > args.max_added_ms
+            for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
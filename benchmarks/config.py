@@ -0,0 +1,42 @@
+"""
+pytest_zafira reads zafira_properties.ini from the working directory, so
+benchmarks switch to a temporary one before importing the plugin.
+"""
+import os
+import tempfile
+
+DEFAULTS = {
+    'service-url': 'http://127.0.0.1:1',
+    'zafira_enabled': 'True',
+    'zafira_app_url': 'http://127.0.0.1:1',
+    'access_token': 'token',
+    'job_name': 'benchmark',
+    'suite_name': 'benchmark',
+    'artifact_expires_in_default_time': '3600',
+    'artifact_log_name': 'test_logs',
+    'aws_access_key': 'testing',
+    'aws_secret_key': 'testing',
+    'aws_screen_shot_bucket': 'benchmark',
+    's3_save_screenshots': 'False',
+}
+
+
+def write_config(directory, **options):
+    config = dict(DEFAULTS)
+    config.update(options)
+    with open(os.path.join(directory, 'zafira_properties.ini'), 'w') as f:
+        f.write('[config]\n')
+        for key, value in config.items():
+            f.write('{} = {}\n'.format(key, value))
+
+
+def use_config(**options):
+    """
+    Writes zafira_properties.ini into a new temporary directory and makes
+    it the working directory
+    :return: path to the directory
+    """
+    directory = tempfile.mkdtemp(prefix='zafira-bench-')
+    write_config(directory, **options)
+    os.chdir(directory)
+    return directory
@@ -0,0 +1,137 @@
+"""
+In-process fake of Zafira REST service for benchmarks. Answers every
+endpoint used by the plugin with a plausible entity, keeps HTTP/1.1
+connections alive and counts requests and opened connections.
+"""
+import gzip
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ZafiraStubServer:
+
+    def __init__(self, latency=0.0, host='127.0.0.1', port=0,
+                 settings=None):
+        """
+        :param latency: seconds to sleep before every response
+        :param settings: tool settings, e.g. of RABBITMQ, returned by
+                         /api/settings endpoints
+        """
+        self.latency = latency
+        self.settings = settings or []
+        self.requests = 0
+        self.connections = 0
+        self.calls = []
+        self.__ids = itertools.count(1)
+        self.__lock = threading.Lock()
+        self.__server = _ThreadingHTTPServer((host, port),
+                                             self.__handler_class())
+        self.__thread = None
+
+    @property
+    def url(self):
+        host, port = self.__server.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.__server.serve_forever)
+        self.__thread.daemon = True
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def reset(self):
+        with self.__lock:
+            self.requests = 0
+            self.connections = 0
+            self.calls = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _record(self, method, path, body):
+        with self.__lock:
+            self.requests += 1
+            self.calls.append((method, path))
+
+    def _on_connection(self):
+        with self.__lock:
+            self.connections += 1
+
+    def _next_id(self):
+        with self.__lock:
+            return next(self.__ids)
+
+    def _respond(self, method, path, body):
+        if method == 'GET':
+            if path.startswith('/api/settings'):
+                return self.settings
+            return {'id': 1, 'username': 'anonymous'}
+        if path == '/api/auth/refresh':
+            return {'accessToken': 'access', 'refreshToken': 'refresh',
+                    'type': 'Bearer', 'expiresIn': 3600}
+        if path.endswith('/search'):
+            return {'results': [], 'totalResults': 0}
+        if path.endswith('/batch'):
+            return [dict(entity, id=self._next_id()) for entity in body]
+        if isinstance(body, dict):
+            entity = dict(body)
+            if entity.get('id') is None:
+                entity['id'] = self._next_id()
+            if path == '/api/tests/runs':
+                entity['ciRunId'] = entity.get('ciRunId') or 'ci-run-id'
+            return entity
+        return body if body is not None else {}
+
+    def __handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                BaseHTTPRequestHandler.setup(self)
+                stub._on_connection()
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self.__handle('GET', None)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                if self.headers.get('Content-Encoding') == 'gzip':
+                    raw = gzip.decompress(raw)
+                self.__handle('POST', json.loads(raw) if raw else None)
+
+            def __handle(self, method, body):
+                stub._record(method, self.path, body)
+                if stub.latency:
+                    time.sleep(stub.latency)
+                data = json.dumps(
+                    stub._respond(method, self.path, body)
+                ).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
@@ -0,0 +1,183 @@
+"""
+pytest plugin loaded into synthetic suites run by bench_plugin_suite.
+Stands in for S3 (moto) and RabbitMQ (in-memory connection), makes every
+test log records and attach an artifact, and writes peak memory of the
+process to BENCH_REPORT when pytest exits.
+
+Configured by environment variables:
+
+* BENCH_LOGS - records logged by every test;
+* BENCH_ARTIFACTS - '1' to attach an artifact to every test;
+* BENCH_REPORT - path to JSON report of the process, xdist workers
+  add their id to it.
+"""
+import io
+import json
+import logging
+import os
+import sys
+import threading
+
+import pytest
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from pytest_zafira.utils.context import Context
+
+LOGS = int(os.environ.get('BENCH_LOGS') or 0)
+ARTIFACTS = os.environ.get('BENCH_ARTIFACTS') == '1'
+REPORT = os.environ.get('BENCH_REPORT')
+
+# RABBITMQ settings returned by the Zafira stub when logs are published
+RABBITMQ_SETTINGS = [
+    {'name': 'RABBITMQ_HOST', 'value': '127.0.0.1'},
+    {'name': 'RABBITMQ_PORT', 'value': '5672'},
+    {'name': 'RABBITMQ_USER', 'value': 'benchmark'},
+    {'name': 'RABBITMQ_PASSWORD', 'value': 'benchmark'},
+    {'name': 'RABBITMQ_ENABLED', 'value': 'true'},
+]
+
+logger = logging.getLogger('benchmark')
+
+
+class InMemoryConnection:
+    """
+    Stand-in for pika.BlockingConnection, counts published messages
+    instead of sending them to a broker
+    """
+    published = 0
+    published_bytes = 0
+    lock = threading.Lock()
+
+    def __init__(self, parameters=None):
+        self.is_open = True
+
+    def channel(self):
+        return InMemoryChannel()
+
+    def process_data_events(self, time_limit=0):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+class InMemoryChannel:
+
+    def __init__(self):
+        self.is_open = True
+
+    def exchange_declare(self, **kwargs):
+        pass
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        with InMemoryConnection.lock:
+            InMemoryConnection.published += 1
+            InMemoryConnection.published_bytes += len(body)
+
+    def close(self):
+        self.is_open = False
+
+
+class SyntheticSuite:
+    """
+    Per-process state of stand-ins
+    """
+
+    def __init__(self):
+        self.s3 = None
+        self.handler = None
+
+    @property
+    def reporting(self):
+        return Context.settings().zafira_enabled
+
+    def start(self):
+        if LOGS:
+            import pika
+            pika.BlockingConnection = InMemoryConnection
+        if ARTIFACTS and self.reporting:
+            try:
+                from moto import mock_aws
+            except ImportError:  # moto < 5
+                from moto import mock_s3 as mock_aws
+            import boto3
+
+            os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+            self.s3 = mock_aws()
+            self.s3.start()
+            boto3.client('s3').create_bucket(
+                Bucket=Context.settings().aws_screen_shot_bucket
+            )
+
+    def attach_log_handler(self):
+        if LOGS and self.reporting:
+            from pytest_zafira import RabbitHandler
+
+            self.handler = RabbitHandler()
+            logging.getLogger().addHandler(self.handler)
+        logging.getLogger().setLevel(logging.INFO)
+
+    def detach_log_handler(self):
+        if self.handler:
+            logging.getLogger().removeHandler(self.handler)
+            self.handler.close()
+
+    def stop(self):
+        if self.s3:
+            self.s3.stop()
+        if REPORT:
+            worker = os.environ.get('PYTEST_XDIST_WORKER')
+            path = '{}.{}'.format(REPORT, worker) if worker else REPORT
+            with open(path, 'w') as f:
+                json.dump({'peak_rss_mb': peak_rss_mb(),
+                           'published': InMemoryConnection.published,
+                           'published_bytes':
+                               InMemoryConnection.published_bytes}, f)
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak / (1024.0 ** 2 if sys.platform == 'darwin' else 1024.0)
+
+
+suite = SyntheticSuite()
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_configure(config):
+    # after the plugin parsed command line options
+    suite.start()
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_sessionstart(session):
+    # test run is registered by now, so logs get its routing key
+    suite.attach_log_handler()
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_sessionfinish(session, exitstatus):
+    suite.detach_log_handler()
+
+
+def pytest_unconfigure(config):
+    suite.stop()
+
+
+@pytest.fixture(autouse=True)
+def synthetic_reporting():
+    for i in range(LOGS):
+        logger.info('synthetic record %d', i)
+    if ARTIFACTS and suite.reporting:
+        from pytest_zafira.utils.artifact import Artifact
+
+        Artifact.upload(io.BytesIO(b'x' * 1024), 'log',
+                        content_type='text/plain', filename='test.log')
+    yield
@@ -1,6 +1,4 @@
-from .zafira_plugin import PyTestZafiraPlugin as ZafiraListener
-from .screenshot_plugin import ZafiraScreenshotCapture
-from .services.rabbitmq_service import LogstashFormatter, RabbitHandler
+from .utils.lazy import lazy_exports
 
 
 __all__ = [
@@ -9,3 +7,12 @@ __all__ = [
     'LogstashFormatter',
     'RabbitHandler'
 ]
+
+# screenshots pull boto3 and logs pull pika, imported when used
+__getattr__ = lazy_exports(__name__, (
+    ('ZafiraListener', '.zafira_plugin', 'PyTestZafiraPlugin'),
+    ('ZafiraScreenshotCapture', '.screenshot_plugin',
+     'ZafiraScreenshotCapture'),
+    ('LogstashFormatter', '.services.rabbitmq_service', 'LogstashFormatter'),
+    ('RabbitHandler', '.services.rabbitmq_service', 'RabbitHandler'),
+))
@@ -1,5 +1,19 @@
-from .payloads import test
-from .client import zafira_client
+from pytest_zafira.utils.lazy import lazy_exports
 
+from .payloads import Test, test
+from .reporting_queue import ReportingQueue, LazyResult
+from .token_manager import TokenManager
 
-__all__ = ['test', 'zafira_client']
+
+__all__ = ['Test', 'test', 'zafira_client', 'ReportingQueue', 'LazyResult',
+           'TokenManager', 'Journal', 'SpoolClient', 'AsyncZafiraClient',
+           'AsyncClientBridge']
+
+# clients pull requests or aiohttp, imported when used
+__getattr__ = lazy_exports(__name__, (
+    ('zafira_client', '.client', 'zafira_client'),
+    ('Journal', '.spool', 'Journal'),
+    ('SpoolClient', '.spool', 'SpoolClient'),
+    ('AsyncZafiraClient', '.async_client', 'AsyncZafiraClient'),
+    ('AsyncClientBridge', '.async_client', 'AsyncClientBridge'),
+))
@@ -1,66 +1,167 @@
-import logging
+import gzip
+import time
 import requests
-from pytest_zafira.exceptions import APIError
+from requests.adapters import HTTPAdapter
+from pytest_zafira.utils.json_backend import dumps
+from pytest_zafira.utils.metrics import endpoint_name, metrics
 
+# retry helpers are kept importable from here
+from .base_api_request import (  # noqa
+    RETRY_STATUS_CODES, BaseAPIRequest, reauthorize, retry_delay
+)
+from .payloads import to_json_ready
 
-class APIRequest:
-    """HTTP methods"""
 
-    logger = logging.getLogger('zafira')
+class APIRequest(BaseAPIRequest):
+    """HTTP methods"""
 
-    def __init__(self, base_url):
-        self.base_url = base_url
+    def __init__(self,
+                 base_url,
+                 pool_size=10,
+                 connect_timeout=None,
+                 read_timeout=None,
+                 gzip_requests=False,
+                 retries=0,
+                 backoff=0.5,
+                 max_backoff=10,
+                 circuit_breaker=None):
+        """
+        :param base_url: Zafira service url
+        :param pool_size: max number of kept-alive connections
+        :param connect_timeout: seconds to wait for connection
+        :param read_timeout: seconds to wait for response
+        :param gzip_requests: compress JSON request bodies
+        :param retries: extra attempts of idempotent calls which failed
+                        because of network or server error
+        :param backoff: delay after the first failed attempt in seconds
+        :param max_backoff: cap of delay between attempts
+        :param circuit_breaker: CircuitBreaker shared by all calls
+        """
+        super().__init__(base_url,
+                         gzip_requests=gzip_requests,
+                         retries=retries,
+                         backoff=backoff,
+                         max_backoff=max_backoff,
+                         circuit_breaker=circuit_breaker)
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
 
     def get(self,
             endpoint,
             headers=None,
-            default_err_msg=None):
+            default_err_msg=None,
+            timeout=None):
 
+        if not self._allow():
+            return self._short_circuit().get(endpoint,
+                                             headers,
+                                             default_err_msg)
         url = self.base_url + endpoint
-        try:
-            response = requests.get(url=url, headers=headers)
-        except APIError as e:
-            self.logger.error(default_err_msg, e)
-        return self.__verify_response(response, url, None)
+        headers = dict(headers) if headers else None
+        with metrics.timer('http', endpoint_name('GET', endpoint)):
+            response = self.__call(
+                lambda: self.session.get(url=url,
+                                         headers=headers,
+                                         timeout=timeout or self.timeout),
+                True,
+                default_err_msg,
+                headers
+            )
+        return self._verify_response(response, url, None)
 
     def post_without_authorization(self,
                                    endpoint,
                                    body=None,
-                                   default_err_msg=None):
+                                   default_err_msg=None,
+                                   idempotent=False,
+                                   timeout=None):
 
+        if not self._allow():
+            return self._short_circuit().post_without_authorization(
+                endpoint, body, default_err_msg
+            )
         url = self.base_url + endpoint
-        try:
-            response = requests.post(url, json=body)
-        except APIError as e:
-            self.logger.error(default_err_msg, e)
-        return self.__verify_response(response, url, body)
+        with metrics.timer('http', endpoint_name('POST', endpoint)):
+            response = self.__call(
+                lambda: self.__post(url, body, timeout=timeout),
+                idempotent,
+                default_err_msg
+            )
+        return self._verify_response(response, url, body)
 
     def post(self,
              endpoint,
              body=None,
              headers=None,
-             default_err_msg=None):
+             default_err_msg=None,
+             idempotent=False,
+             timeout=None):
 
+        if not self._allow():
+            return self._short_circuit().post(endpoint,
+                                              body,
+                                              headers,
+                                              default_err_msg)
         url = self.base_url + endpoint
-        try:
-            response = requests.post(url, json=body, headers=headers)
-        except APIError as e:
-            self.logger.error(default_err_msg, e)
-        return self.__verify_response(response, url, body)
+        headers = dict(headers) if headers else None
+        with metrics.timer('http', endpoint_name('POST', endpoint)):
+            response = self.__call(
+                lambda: self.__post(url, body, headers, timeout),
+                idempotent,
+                default_err_msg,
+                headers
+            )
+        return self._verify_response(response, url, body)
+
+    def close(self):
+        self.session.close()
 
-    @staticmethod
-    def __verify_response(response, url=None, body=None):
+    def __call(self, send, idempotent, default_err_msg, headers=None):
         """
-        Log and check API call. In case status code of response is not 200,
-        will raise an HTTPException
+        Sends request, retrying idempotent ones on network and server
+        errors, and any call once with refreshed token if it is rejected
+        :param headers: headers used by send, Authorization is replaced in
+                        place
+        :return: response
         """
-        status_code = response.status_code
-        if status_code > 200:
-            err_msg = "HTTP call fails." \
-                      " Response status code {}" \
-                      " from {}" \
-                      " with body {}".format(status_code, url, body)
+        attempts = self._attempts(idempotent)
+        attempt = 0
+        reauthorized = False
+        while True:
+            attempt += 1
+            response = error = None
+            try:
+                response = send()
+            except requests.RequestException as e:
+                error = e
+            else:
+                if response.status_code == 401 and not reauthorized and \
+                        reauthorize(self.authenticator, headers):
+                    reauthorized = True
+                    attempt -= 1
+                    continue
+            delay = self._next_delay(attempt, attempts, response, error,
+                                     default_err_msg)
+            if delay is None:
+                return response
+            time.sleep(delay)
 
-            raise APIError(err_msg)
+    def __post(self, url, body, headers=None, timeout=None):
+        if body is None:
+            return self.session.post(url,
+                                     headers=headers,
+                                     timeout=timeout or self.timeout)
 
-        return response
+        headers = dict(headers or {})
+        headers['Content-Type'] = 'application/json'
+        data = dumps(to_json_ready(body))
+        if self.gzip_requests:
+            headers['Content-Encoding'] = 'gzip'
+            data = gzip.compress(data)
+        return self.session.post(url,
+                                 data=data,
+                                 headers=headers,
+                                 timeout=timeout or self.timeout)
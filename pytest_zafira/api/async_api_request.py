@@ -0,0 +1,188 @@
+import asyncio
+import gzip
+import json
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from pytest_zafira.exceptions import ZafiraError
+from pytest_zafira.utils.json_backend import dumps
+from pytest_zafira.utils.metrics import endpoint_name, metrics
+
+from .base_api_request import BaseAPIRequest, reauthorize
+from .payloads import to_json_ready
+
+
+class AsyncResponse:
+    """
+    Response with body already read, has the part of requests.Response
+    used by ZafiraClient callers
+    """
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncAPIRequest(BaseAPIRequest):
+    """
+    HTTP methods on aiohttp, same as APIRequest ones but coroutines.
+    Connections are pooled by one session per event loop, authenticator
+    may block, so it runs on executor
+    """
+
+    def __init__(self,
+                 base_url,
+                 pool_size=10,
+                 connect_timeout=None,
+                 read_timeout=None,
+                 gzip_requests=False,
+                 retries=0,
+                 backoff=0.5,
+                 max_backoff=10,
+                 circuit_breaker=None):
+        """
+        Parameters are the same as APIRequest ones
+        """
+        if aiohttp is None:
+            raise ZafiraError(
+                'aiohttp is required for async Zafira client, install '
+                'pytest-zafira[async]'
+            )
+        super().__init__(base_url,
+                         gzip_requests=gzip_requests,
+                         retries=retries,
+                         backoff=backoff,
+                         max_backoff=max_backoff,
+                         circuit_breaker=circuit_breaker)
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.session = None
+
+    async def get(self,
+                  endpoint,
+                  headers=None,
+                  default_err_msg=None,
+                  timeout=None):
+
+        if not self._allow():
+            return self._short_circuit().get(endpoint,
+                                             headers,
+                                             default_err_msg)
+        url = self.base_url + endpoint
+        with metrics.timer('http', endpoint_name('GET', endpoint)):
+            response = await self.__call('GET', url, None, headers,
+                                         timeout, True, default_err_msg)
+        return self._verify_response(response, url, None)
+
+    async def post_without_authorization(self,
+                                         endpoint,
+                                         body=None,
+                                         default_err_msg=None,
+                                         idempotent=False,
+                                         timeout=None):
+
+        if not self._allow():
+            return self._short_circuit().post_without_authorization(
+                endpoint, body, default_err_msg
+            )
+        url = self.base_url + endpoint
+        with metrics.timer('http', endpoint_name('POST', endpoint)):
+            response = await self.__call('POST', url, body, None, timeout,
+                                         idempotent, default_err_msg)
+        return self._verify_response(response, url, body)
+
+    async def post(self,
+                   endpoint,
+                   body=None,
+                   headers=None,
+                   default_err_msg=None,
+                   idempotent=False,
+                   timeout=None):
+
+        if not self._allow():
+            return self._short_circuit().post(endpoint,
+                                              body,
+                                              headers,
+                                              default_err_msg)
+        url = self.base_url + endpoint
+        with metrics.timer('http', endpoint_name('POST', endpoint)):
+            response = await self.__call('POST', url, body, headers,
+                                         timeout, idempotent,
+                                         default_err_msg)
+        return self._verify_response(response, url, body)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def __get_session(self):
+        # session is bound to the loop it is created in
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=self.connect_timeout,
+                    sock_read=self.read_timeout
+                )
+            )
+        return self.session
+
+    async def __send(self, method, url, body, headers, timeout):
+        headers = dict(headers or {})
+        data = None
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+            data = dumps(to_json_ready(body))
+            if self.gzip_requests:
+                headers['Content-Encoding'] = 'gzip'
+                data = gzip.compress(data)
+        kwargs = {}
+        if timeout is not None:
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        async with self.__get_session().request(method,
+                                                url,
+                                                data=data,
+                                                headers=headers,
+                                                **kwargs) as response:
+            return AsyncResponse(response.status, await response.text())
+
+    async def __call(self, method, url, body, headers, timeout,
+                     idempotent, default_err_msg):
+        attempts = self._attempts(idempotent)
+        attempt = 0
+        reauthorized = False
+        headers = dict(headers) if headers else None
+        while True:
+            attempt += 1
+            response = error = None
+            try:
+                response = await self.__send(method, url, body, headers,
+                                             timeout)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            else:
+                if response.status_code == 401 and not reauthorized and \
+                        await self.__reauthorize(headers):
+                    reauthorized = True
+                    attempt -= 1
+                    continue
+            delay = self._next_delay(attempt, attempts, response, error,
+                                     default_err_msg)
+            if delay is None:
+                return response
+            await asyncio.sleep(delay)
+
+    async def __reauthorize(self, headers):
+        if self.authenticator is None:
+            return False
+        return await asyncio.get_event_loop().run_in_executor(
+            None, reauthorize, self.authenticator, headers
+        )
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+
+from pytest_zafira.constants import URL_PATH
+
+from .async_api_request import AsyncAPIRequest
+from .client import ZafiraClient
+
+
+class AsyncZafiraClient(ZafiraClient):
+    """
+    ZafiraClient for asyncio code: methods are the same, but return
+    coroutines, so reporting never blocks the event loop
+    """
+    API_REQUEST = AsyncAPIRequest
+
+    async def is_zafira_available(self):
+        response = await self.api.get(
+            URL_PATH['STATUS_PATH'],
+            default_err_msg="Unable to send ping"
+        )
+        return response.status_code == 200
+
+    @staticmethod
+    async def fan_out(calls, concurrency=10):
+        """
+        Awaits many calls at once, e.g. to finish a bunch of tests
+        :param calls: coroutines returned by client methods
+        :param concurrency: max number of calls in flight
+        :return: results in the order of calls
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(call):
+            async with semaphore:
+                return await call
+
+        return await asyncio.gather(*[limited(call) for call in calls])
+
+    async def create_test_cases_concurrently(self,
+                                             test_cases,
+                                             concurrency=10):
+        """
+        Registers test cases one by one but concurrently, for Zafira
+        without batch endpoint
+        :param test_cases: list of TestCase built by build_test_case
+        :return: responses in the order of test cases
+        """
+        return await self.fan_out([
+            self.create_test_case(test_case.testClass,
+                                  test_case.testMethod,
+                                  test_case.testSuiteId,
+                                  test_case.primaryOwnerId,
+                                  test_case.info,
+                                  test_case.project)
+            for test_case in test_cases
+        ], concurrency)
+
+    async def close(self):
+        await self.api.close()
+
+
+class AsyncClientBridge:
+    """
+    Blocking facade of AsyncZafiraClient for pytest hooks. Calls run on
+    event loop of a background thread, which keeps the pooled aiohttp
+    connections
+    """
+
+    def __init__(self, client, timeout=None):
+        """
+        :param client: AsyncZafiraClient
+        :param timeout: max seconds to wait for a call, None means
+                        HTTP timeouts of client only
+        """
+        self.__dict__['client'] = client
+        self.__dict__['timeout'] = timeout
+        self.__dict__['loop'] = asyncio.new_event_loop()
+        thread = threading.Thread(target=self.loop.run_forever,
+                                  name='ZafiraEventLoop')
+        thread.daemon = True
+        thread.start()
+
+    def run(self, coroutine):
+        """
+        :return: result of coroutine run on the bridge loop
+        """
+        return asyncio.run_coroutine_threadsafe(
+            coroutine, self.loop
+        ).result(self.timeout)
+
+    def close(self):
+        self.run(self.client.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            if asyncio.iscoroutine(result):
+                return self.run(result)
+            return result
+        return call
+
+    def __setattr__(self, name, value):
+        # e.g. access_token belongs to the client
+        setattr(self.client, name, value)
@@ -0,0 +1,168 @@
+import logging
+import random
+
+from pytest_zafira.exceptions import APIError, CircuitOpenError
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def retry_delay(attempt, backoff, max_backoff=None):
+    """
+    Exponential backoff with full jitter
+    :param attempt: number of failed attempts, starting from 1
+    :param backoff: delay after the first failed attempt in seconds
+    :param max_backoff: cap of delay
+    """
+    delay = backoff * 2 ** (attempt - 1)
+    if max_backoff is not None:
+        delay = min(delay, max_backoff)
+    return random.uniform(0, delay)
+
+
+def reauthorize(authenticator, headers):
+    """
+    Replaces rejected token in headers by a fresh one
+    :return: True if call can be repeated with headers
+    """
+    if authenticator is None or not headers or \
+            'Authorization' not in headers:
+        return False
+    authorization = authenticator(headers['Authorization'])
+    if not authorization:
+        return False
+    headers['Authorization'] = authorization
+    return True
+
+
+def describe_error(error):
+    """
+    :return: message of network error, or its repr if message is empty,
+             e.g. of timeout
+    """
+    return str(error) or repr(error)
+
+
+class BaseAPIRequest:
+    """
+    Circuit breaker, fallback and retry policy of HTTP methods,
+    subclasses send calls with their transport
+    """
+
+    logger = logging.getLogger('zafira')
+
+    def __init__(self,
+                 base_url,
+                 gzip_requests=False,
+                 retries=0,
+                 backoff=0.5,
+                 max_backoff=10,
+                 circuit_breaker=None):
+        """
+        :param base_url: Zafira service url
+        :param gzip_requests: compress JSON request bodies
+        :param retries: extra attempts of idempotent calls which failed
+                        because of network or server error
+        :param backoff: delay after the first failed attempt in seconds
+        :param max_backoff: cap of delay between attempts
+        :param circuit_breaker: CircuitBreaker shared by all calls
+        """
+        self.base_url = base_url
+        self.gzip_requests = gzip_requests
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.circuit_breaker = circuit_breaker
+        self.fallback = None
+        self.authenticator = None
+
+    def use_fallback(self, fallback, permanent=False):
+        """
+        :param fallback: object with the same methods, which serves calls
+                         while circuit is open
+        :param permanent: keep circuit open once it is opened, e.g. when
+                          fallback results can't be mixed with Zafira ones
+        """
+        self.fallback = fallback
+        if permanent and self.circuit_breaker:
+            self.circuit_breaker.reset_timeout = None
+
+    def use_authenticator(self, authenticator):
+        """
+        :param authenticator: callable which gets Authorization header of
+                              call rejected with 401 and returns header to
+                              repeat the call with once, or None
+        """
+        self.authenticator = authenticator
+
+    def _allow(self):
+        return self.circuit_breaker is None or self.circuit_breaker.allow()
+
+    def _short_circuit(self):
+        if self.fallback is None:
+            raise CircuitOpenError(
+                "Zafira calls are stopped after {} failures".format(
+                    self.circuit_breaker.failures
+                )
+            )
+        return self.fallback
+
+    def _attempts(self, idempotent):
+        return 1 + (self.retries if idempotent else 0)
+
+    def _next_delay(self, attempt, attempts, response, error,
+                    default_err_msg):
+        """
+        Records outcome of attempt and decides whether to repeat it
+        :param attempt: number of attempt, starting from 1
+        :param attempts: max number of attempts
+        :param response: response of attempt, None if it failed with error
+        :param error: network error of attempt
+        :return: seconds to wait before next attempt, None if response is
+                 final
+        """
+        if error is None and response.status_code not in RETRY_STATUS_CODES:
+            self._record(True)
+            return None
+        if attempt >= attempts:
+            self._record(False)
+            if error is None:
+                return None
+            raise APIError("{}: {}".format(
+                default_err_msg or "HTTP call fails", describe_error(error)
+            ))
+        delay = retry_delay(attempt, self.backoff, self.max_backoff)
+        self.logger.debug(
+            "Zafira call failed, retry in {:.2f} seconds: {}".format(
+                delay, describe_error(error) if error is not None
+                else response.status_code
+            )
+        )
+        return delay
+
+    def _record(self, success):
+        if self.circuit_breaker is None:
+            return
+        if success:
+            self.circuit_breaker.record_success()
+        elif self.circuit_breaker.record_failure():
+            self.logger.error(
+                "Zafira is unavailable after {} failed calls, next calls "
+                "are short-circuited".format(self.circuit_breaker.failures)
+            )
+
+    @staticmethod
+    def _verify_response(response, url=None, body=None):
+        """
+        Log and check API call. In case status code of response is not 200,
+        will raise an HTTPException
+        """
+        status_code = response.status_code
+        if status_code > 200:
+            err_msg = "HTTP call fails." \
+                      " Response status code {}" \
+                      " from {}" \
+                      " with body {}".format(status_code, url, body)
+
+            raise APIError(err_msg, status_code=status_code)
+
+        return response
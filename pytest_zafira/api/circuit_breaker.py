@@ -0,0 +1,60 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Stops calls to Zafira after several consecutive failures. When reset
+    timeout passes, a single trial call is let through: success closes
+    the circuit, failure opens it again
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        """
+        :param failure_threshold: consecutive failures which open the
+                                  circuit, 0 disables the breaker
+        :param reset_timeout: seconds before a trial call, None keeps
+                              circuit open till the end of session
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.__opened_at = None
+        self.__lock = threading.Lock()
+
+    def allow(self):
+        """
+        :return: False if call must be short-circuited
+        """
+        with self.__lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.reset_timeout is not None \
+                    and time.time() - self.__opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self.__lock:
+            self.failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        """
+        :return: True if this failure opened the circuit
+        """
+        with self.__lock:
+            self.failures += 1
+            if not self.failure_threshold or self.state == self.OPEN:
+                return False
+            if self.state == self.HALF_OPEN or \
+                    self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.__opened_at = time.time()
+                return True
+            return False
@@ -1,27 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from pytest_zafira.constants import (TEST_STATUS,
                                      INITIATOR,
                                      DRIVER_MODE,
-                                     URL_PATH,
-                                     PARAMETER)
+                                     URL_PATH)
 
 from pytest_zafira.utils.context import Context
 
 from .api_request import APIRequest
-from .payloads import (job,
-                       refresh_token,
-                       test,
-                       test_suite,
-                       test_case,
-                       test_run,
-                       test_artifact)
+from .circuit_breaker import CircuitBreaker
+from .payloads import (Job,
+                       RefreshToken,
+                       Test,
+                       TestSuite,
+                       TestCase,
+                       TestRun,
+                       TestArtifact)
 
 
 class ZafiraClient:
     DEFAULT_USER = "anonymous"
+    # every method returns what API_REQUEST returns, so with async
+    # implementation the same methods return coroutines
+    API_REQUEST = APIRequest
 
     def __init__(self):
         self.access_token = ''
-        self.api = APIRequest(Context.get(PARAMETER['SERVICE_URL']))
+        self.__api = None
+
+    @property
+    def api(self):
+        # built on first call, when command line options are already parsed
+        if self.__api is None:
+            settings = Context.settings()
+            self.__api = self.API_REQUEST(
+                settings.service_url,
+                pool_size=settings.http_pool_size,
+                connect_timeout=settings.http_connect_timeout,
+                read_timeout=settings.http_read_timeout,
+                gzip_requests=settings.http_gzip_requests,
+                retries=settings.http_retries,
+                backoff=settings.http_retry_backoff,
+                max_backoff=settings.http_retry_max_backoff,
+                circuit_breaker=CircuitBreaker(
+                    settings.circuit_breaker_threshold,
+                    settings.circuit_breaker_reset_timeout
+                )
+            )
+        return self.__api
+
+    @api.setter
+    def api(self, api):
+        self.__api = api
 
     def get_setting_tool(self, tool, decrypt):
         return self.api.get(
@@ -30,6 +60,13 @@ class ZafiraClient:
             "Unable to get settings by tool"
         )
 
+    def get_known_issues(self, endpoint):
+        return self.api.get(
+            endpoint,
+            self.init_auth_headers(),
+            "Unable to get known issues"
+        )
+
     def is_zafira_available(self):
         status_code = self.api.get(
             URL_PATH['STATUS_PATH'],
@@ -43,16 +80,15 @@ class ZafiraClient:
                           file_name,
                           description=None):
 
-        test_suite['userId'] = user_id
-        test_suite['description'] = description
-        test_suite['fileName'] = file_name
-        test_suite['name'] = suite_name
-
         return self.api.post(
             URL_PATH['TEST_SUITES_PATH'],
-            test_suite,
+            TestSuite(userId=user_id,
+                      description=description,
+                      fileName=file_name,
+                      name=suite_name),
             self.init_auth_headers(),
-            "Unable to create test suite"
+            "Unable to create test suite",
+            idempotent=True
         )
 
     def create_test_case(self,
@@ -63,31 +99,88 @@ class ZafiraClient:
                          info=None,
                          project=None):
 
-        test_case['testClass'] = test_class
-        test_case['testMethod'] = test_method
-        test_case['testSuiteId'] = test_suite_id
-        test_case['primaryOwnerId'] = user_id
-        test_case['info'] = info
-        test_case['project'] = project
-
         return self.api.post(
             URL_PATH['TEST_CASES_PATH'],
-            test_case,
+            self.build_test_case(test_class, test_method, test_suite_id,
+                                 user_id, info, project),
             self.init_auth_headers(),
-            "Unable to create test case"
+            "Unable to create test case",
+            idempotent=True
         )
 
-    def create_job(self, user_id, job_name, job_url, jenkins_host):
-        job["userId"] = user_id
-        job["jobURL"] = job_url
-        job["name"] = job_name
-        job["jenkinsHost"] = jenkins_host
+    def create_test_cases(self, test_cases):
+        """
+        Registers several test cases by one request
+        :param test_cases: list of TestCase built by build_test_case
+        """
+        return self.api.post(
+            URL_PATH['TEST_CASES_BATCH_PATH'],
+            test_cases,
+            self.init_auth_headers(),
+            "Unable to create test cases",
+            idempotent=True
+        )
+
+    def create_test_cases_concurrently(self, test_cases, concurrency=10):
+        """
+        Registers test cases one by one but concurrently, for Zafira
+        without batch endpoint
+        :param test_cases: list of TestCase built by build_test_case
+        :return: responses in the order of test cases
+        """
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(
+                lambda test_case: self.create_test_case(
+                    test_case.testClass,
+                    test_case.testMethod,
+                    test_case.testSuiteId,
+                    test_case.primaryOwnerId,
+                    test_case.info,
+                    test_case.project
+                ),
+                test_cases
+            ))
+
+    @staticmethod
+    def build_test_case(test_class,
+                        test_method,
+                        test_suite_id,
+                        user_id,
+                        info=None,
+                        project=None):
+
+        return TestCase(testClass=test_class,
+                        testMethod=test_method,
+                        testSuiteId=test_suite_id,
+                        primaryOwnerId=user_id,
+                        info=info,
+                        project=project)
+
+    def search_test_cases(self, test_suite_id, page_size=10000):
+        search_criteria = {
+            'testSuiteId': test_suite_id,
+            'page': 1,
+            'pageSize': page_size
+        }
 
+        return self.api.post(
+            URL_PATH['TEST_CASES_SEARCH_PATH'],
+            search_criteria,
+            self.init_auth_headers(),
+            "Unable to search test cases",
+            idempotent=True
+        )
+
+    def create_job(self, user_id, job_name, job_url, jenkins_host):
         return self.api.post(
             URL_PATH['JOBS_PATH'],
-            job,
+            Job(userId=user_id,
+                jobURL=job_url,
+                name=job_name,
+                jenkinsHost=jenkins_host),
             self.init_auth_headers(),
-            "Unable to create job"
+            "Unable to create job",
+            idempotent=True
         )
 
     def start_test_run(self,
@@ -103,21 +196,19 @@ class ZafiraClient:
                        project=None,
                        known_issue=None):
 
-        test_run["jobId"] = job_id
-        test_run["testSuiteId"] = test_suite_id
-        test_run["buildNumber"] = build_number
-        test_run["startedBy"] = started_by
-        test_run["driverMode"] = driver_mode
-        test_run["blocker"] = blocker
-        test_run["workItem"] = work_item
-        test_run["status"] = status
-        test_run["project"] = project
-        test_run["knownIssue"] = known_issue
-        test_run["configXML"] = config
-
         resp = self.api.post(
             URL_PATH['TEST_RUNS_PATH'],
-            test_run,
+            TestRun(jobId=job_id,
+                    testSuiteId=test_suite_id,
+                    buildNumber=build_number,
+                    startedBy=started_by,
+                    driverMode=driver_mode,
+                    blocker=blocker,
+                    workItem=work_item,
+                    status=status,
+                    project=project,
+                    knownIssue=known_issue,
+                    configXML=config),
             self.init_auth_headers(),
             "Unable to start test run"
         )
@@ -128,7 +219,8 @@ class ZafiraClient:
         return self.api.post(
             URL_PATH['TEST_RUNS_FINISH_PATH'].format(test_run_id),
             headers=self.init_auth_headers(),
-            default_err_msg="Unable to finish test run"
+            default_err_msg="Unable to finish test run",
+            idempotent=True
         )
 
     def start_test(self,
@@ -142,19 +234,17 @@ class ZafiraClient:
                    test_group=None,
                    work_items=None):
 
-        test["testRunId"] = test_run_id
-        test["testCaseId"] = test_case_id
-        test["name"] = test_name
-        test["ciTestId"] = ci_test_id
-        test["startTime"] = start_time
-        test["testClass"] = test_class
-        test["status"] = status
-        test["workItems"] = work_items
-        test["testGroup"] = test_group
-
         return self.api.post(
             URL_PATH['TESTS_PATH'],
-            test,
+            Test(testRunId=test_run_id,
+                 testCaseId=test_case_id,
+                 name=test_name,
+                 ciTestId=ci_test_id,
+                 startTime=start_time,
+                 testClass=test_class,
+                 status=status,
+                 workItems=work_items,
+                 testGroup=test_group),
             self.init_auth_headers(),
             "Unable to start test"
         )
@@ -164,7 +254,8 @@ class ZafiraClient:
             URL_PATH['TEST_FINISH_PATH'].format(test["id"]),
             test,
             self.init_auth_headers(),
-            "Unable to finish test"
+            "Unable to finish test",
+            idempotent=True
         )
 
     def add_test_artifact_to_test(self,
@@ -173,25 +264,23 @@ class ZafiraClient:
                                   artifact_name,
                                   expires_in=None):
 
-        test_artifact["testId"] = test_id
-        test_artifact["link"] = link
-        test_artifact["name"] = artifact_name
-        test_artifact["expiresIn"] = expires_in
-
         return self.api.post(
             URL_PATH['ADD_TEST_ARTIFACT'].format(test_id),
-            test_artifact,
+            TestArtifact(testId=test_id,
+                         link=link,
+                         name=artifact_name,
+                         expiresIn=expires_in),
             self.init_auth_headers(),
-            "Unable to add test artifact"
+            "Unable to add test artifact",
+            idempotent=True
         )
 
     def refresh_token(self, token):
-        refresh_token["refreshToken"] = token
-
         return self.api.post_without_authorization(
             URL_PATH['REFRESH_TOKEN_PATH'],
-            refresh_token,
-            "Unable to refresh token"
+            RefreshToken(refreshToken=token),
+            "Unable to refresh token",
+            idempotent=True
         )
 
     def create_test_work_items(self, test_id, list_work_items):
@@ -215,5 +304,8 @@ class ZafiraClient:
     def init_auth_headers(self):
         return {"Authorization": "Bearer " + self.access_token}
 
+    def close(self):
+        self.api.close()
+
 
 zafira_client = ZafiraClient()
@@ -1,13 +1,27 @@
-from .job import job
-from .refresh_token import refresh_token
-from .test_suite import test_suite
-from .test_case import test_case
-from .test_run import test_run
-from .test_artifact import test_artifact
-from .test import test
+from .payload import Payload, payload_type, to_json_ready
+from .job import Job, job
+from .project_payload import Project
+from .refresh_token import RefreshToken, refresh_token
+from .test_suite import TestSuite, test_suite
+from .test_case import TestCase, test_case
+from .test_run import TestRun, test_run
+from .test_artifact import TestArtifact, test_artifact
+from .test import Test, test
 
 
 __all__ = [
+    'Payload',
+    'payload_type',
+    'to_json_ready',
+    'Job',
+    'Project',
+    'RefreshToken',
+    'TestSuite',
+    'TestCase',
+    'TestRun',
+    'TestArtifact',
+    'Test',
+    # deprecated dict templates
     'job',
     'refresh_token',
     'test_suite',
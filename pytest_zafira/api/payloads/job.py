@@ -1,7 +1,16 @@
-job = {
-    "id": None,
-    "jenkinsHost": "JENKINS_HOST",
-    "jobURL": "JOB_URL",
-    "name": "NAME",
-    "userId": "USER_ID_INT"
-}
+from .payload import payload_type
+
+Job = payload_type('Job', (
+    'id',
+    'jenkinsHost',
+    'jobURL',
+    'name',
+    'userId'
+))
+
+# dict template of the former API, deprecated, kept for backward
+# compatibility
+job = Job(jenkinsHost='JENKINS_HOST',
+          jobURL='JOB_URL',
+          name='NAME',
+          userId='USER_ID_INT').to_dict()
@@ -0,0 +1,47 @@
+from collections import namedtuple
+
+
+class Payload:
+    """
+    Base of immutable request bodies. Payloads are safe to build on many
+    threads and to queue without copying. Fields are read as attributes
+    or by JSON name like in dicts
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def to_dict(self):
+        return dict(zip(self._fields, self))
+
+
+def payload_type(name, fields, defaults=None):
+    """
+    Creates immutable payload type
+    :param name: name of type
+    :param fields: JSON field names
+    :param defaults: values of fields not passed to constructor,
+                     None by default
+    :return: namedtuple based Payload subclass
+    """
+    defaults = defaults or {}
+    fields_type = namedtuple(name + 'Fields', fields)
+    fields_type.__new__.__defaults__ = tuple(
+        defaults.get(field) for field in fields
+    )
+    return type(name, (Payload, fields_type), {'__slots__': ()})
+
+
+def to_json_ready(body):
+    """
+    :return: body with payloads replaced by dicts, which any JSON
+             encoder can serialize
+    """
+    if isinstance(body, Payload):
+        return body.to_dict()
+    if isinstance(body, list) and body and isinstance(body[0], Payload):
+        return [item.to_dict() for item in body]
+    return body
@@ -1,5 +1,11 @@
-project = {
-    "description": "DESCRIPTION",
-    "id": None,
-    "name": "NAME"
-}
+from .payload import payload_type
+
+Project = payload_type('Project', (
+    'description',
+    'id',
+    'name'
+))
+
+# dict template of the former API, deprecated, kept for backward
+# compatibility
+project = Project(description='DESCRIPTION', name='NAME').to_dict()
@@ -1,3 +1,9 @@
-refresh_token = {
-  "refreshToken": "REFRESH_TOKEN"
-}
+from .payload import payload_type
+
+RefreshToken = payload_type('RefreshToken', (
+    'refreshToken',
+))
+
+# dict template of the former API, deprecated, kept for backward
+# compatibility
+refresh_token = RefreshToken(refreshToken='REFRESH_TOKEN').to_dict()
@@ -1,24 +1,34 @@
-test = {
-  "artifacts": [],
-  "blocker": None,
-  "ciTestId": None,
-  "configXML": None,
-  "dependsOnMethods": None,
-  "finishTime": None,
-  "id": None,
-  "knownIssue": None,
-  "message": None,
-  "messageHashCode": None,
-  "name": "NAME",
-  "needRerun": None,
-  "retry": None,
-  "startTime": None,
-  "status": None,
-  "testArgs": None,
-  "testCaseId": "TEST_CASE_ID_INT",
-  "testClass": None,
-  "testGroup": None,
-  "testMetrics": None,
-  "testRunId": "TEST_RUN_ID_INT",
-  "workItems": []
-}
+from .payload import payload_type
+
+Test = payload_type('Test', (
+    'artifacts',
+    'blocker',
+    'ciTestId',
+    'configXML',
+    'dependsOnMethods',
+    'finishTime',
+    'id',
+    'knownIssue',
+    'message',
+    'messageHashCode',
+    'name',
+    'needRerun',
+    'retry',
+    'startTime',
+    'status',
+    'testArgs',
+    'testCaseId',
+    'testClass',
+    'testGroup',
+    'testMetrics',
+    'testRunId',
+    'workItems'
+), {'artifacts': (), 'workItems': ()})
+
+# dict template of the former API, deprecated, kept for backward
+# compatibility
+test = Test(artifacts=[],
+            name='NAME',
+            testCaseId='TEST_CASE_ID_INT',
+            testRunId='TEST_RUN_ID_INT',
+            workItems=[]).to_dict()
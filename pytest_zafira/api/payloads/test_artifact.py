@@ -1,7 +1,15 @@
-test_artifact = {
-      "expiresIn": None,
-      "id": None,
-      "link": "LINK",
-      "name": "NAME",
-      "testId": "TEST_ID_INT"
-}
+from .payload import payload_type
+
+TestArtifact = payload_type('TestArtifact', (
+    'expiresIn',
+    'id',
+    'link',
+    'name',
+    'testId'
+))
+
+# dict template of the former API, deprecated, kept for backward
+# compatibility
+test_artifact = TestArtifact(link='LINK',
+                             name='NAME',
+                             testId='TEST_ID_INT').to_dict()
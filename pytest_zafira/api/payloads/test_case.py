@@ -1,10 +1,19 @@
-test_case = {
-  "id": None,
-  "info": None,
-  "primaryOwnerId": "OWNER_ID_INT",
-  "project": None,
-  "secondaryOwnerId": None,
-  "testClass": "TEST_CLASS",
-  "testMethod": "TEST_METHOD",
-  "testSuiteId": "TEST_SUITE_ID_INT"
-}
+from .payload import payload_type
+
+TestCase = payload_type('TestCase', (
+    'id',
+    'info',
+    'primaryOwnerId',
+    'project',
+    'secondaryOwnerId',
+    'testClass',
+    'testMethod',
+    'testSuiteId'
+))
+
+# dict template of the former API, deprecated, kept for backward
+# compatibility
+test_case = TestCase(primaryOwnerId='OWNER_ID_INT',
+                     testClass='TEST_CLASS',
+                     testMethod='TEST_METHOD',
+                     testSuiteId='TEST_SUITE_ID_INT').to_dict()
@@ -1,22 +1,32 @@
-test_run = {
-  "blocker": None,
-  "buildNumber": "BUILD_NUMBER_INT",
-  "ciRunId": None,
-  "configXML": None,
-  "driverMode": "DRIVER_MODE",
-  "id": None,
-  "jobId": "JOB_ID_INT",
-  "knownIssue": None,
-  "project": None,
-  "reviewed": None,
-  "scmBranch": None,
-  "scmCommit": None,
-  "scmURL": None,
-  "startedBy": "STARTED_BY",
-  "status": None,
-  "testSuiteId": "TEST_SUITE_ID_INT",
-  "upstreamJobBuildNumber": None,
-  "upstreamJobId": None,
-  "userId": None,
-  "workItem": None
-}
+from .payload import payload_type
+
+TestRun = payload_type('TestRun', (
+    'blocker',
+    'buildNumber',
+    'ciRunId',
+    'configXML',
+    'driverMode',
+    'id',
+    'jobId',
+    'knownIssue',
+    'project',
+    'reviewed',
+    'scmBranch',
+    'scmCommit',
+    'scmURL',
+    'startedBy',
+    'status',
+    'testSuiteId',
+    'upstreamJobBuildNumber',
+    'upstreamJobId',
+    'userId',
+    'workItem'
+))
+
+# dict template of the former API, deprecated, kept for backward
+# compatibility
+test_run = TestRun(buildNumber='BUILD_NUMBER_INT',
+                   driverMode='DRIVER_MODE',
+                   jobId='JOB_ID_INT',
+                   startedBy='STARTED_BY',
+                   testSuiteId='TEST_SUITE_ID_INT').to_dict()
@@ -1,6 +1,14 @@
-test_suite = {
-  "description": None,
-  "fileName": "FILE_NAME",
-  "name": "NAME",
-  "userId": "USER_ID"
-}
+from .payload import payload_type
+
+TestSuite = payload_type('TestSuite', (
+    'description',
+    'fileName',
+    'name',
+    'userId'
+))
+
+# dict template of the former API, deprecated, kept for backward
+# compatibility
+test_suite = TestSuite(fileName='FILE_NAME',
+                       name='NAME',
+                       userId='USER_ID').to_dict()
@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from pytest_zafira.exceptions import ZafiraError
+
+
+class LazyResult:
+    """
+    Placeholder for a value which will be returned by a queued Zafira call.
+    Item assignments made before the call is sent are kept aside and
+    applied on top of the resolved entity, so hooks can keep updating
+    e.g. test status without waiting for the server
+    """
+
+    def __init__(self):
+        self.__event = threading.Event()
+        self.__value = None
+        self.__error = None
+        self.__overrides = {}
+
+    def set_result(self, value):
+        self.__value = value
+        self.__event.set()
+
+    def set_error(self, error):
+        self.__error = error
+        self.__event.set()
+
+    def done(self):
+        return self.__event.is_set()
+
+    def get(self, timeout=None):
+        """
+        Blocks until the queued call is sent
+        :param timeout: max number of seconds to wait
+        :return: resolved value merged with local item assignments
+        """
+        if not self.__event.wait(timeout):
+            raise ZafiraError('Queued Zafira call is not sent yet')
+        if self.__error is not None:
+            raise ZafiraError(
+                'Queued Zafira call failed: {}'.format(self.__error)
+            )
+        if self.__overrides and isinstance(self.__value, dict):
+            self.__value.update(self.__overrides)
+            self.__overrides = {}
+        return self.__value
+
+    def __getitem__(self, key):
+        if key in self.__overrides:
+            return self.__overrides[key]
+        return self.get()[key]
+
+    def __setitem__(self, key, value):
+        if self.done() and isinstance(self.__value, dict):
+            self.__value[key] = value
+        else:
+            self.__overrides[key] = value
+
+
+class ReportingQueue:
+    """
+    Sends Zafira calls from a background thread. Calls are sent one by one
+    in the order they were submitted, so a call may safely depend on
+    the result of an earlier one: LazyResult arguments are resolved right
+    before the call is sent
+    """
+
+    logger = logging.getLogger('zafira')
+
+    def __init__(self):
+        self.__calls = deque()
+        self.__condition = threading.Condition()
+        self.__pending = 0
+        self.__worker = None
+
+    def start(self):
+        if self.__worker is None:
+            self.__worker = threading.Thread(target=self.__run,
+                                             name='ZafiraReporter')
+            # a hung Zafira must never keep the interpreter alive
+            self.__worker.daemon = True
+            self.__worker.start()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Enqueues a call
+        :param func: callable which sends data to Zafira
+        :return: LazyResult resolved with the value returned by func
+        """
+        result = LazyResult()
+        with self.__condition:
+            self.__calls.append((func, args, kwargs, result))
+            self.__pending += 1
+            self.__condition.notify_all()
+        return result
+
+    def drain(self, timeout=None):
+        """
+        Waits until all submitted calls are sent
+        :param timeout: deadline in seconds, None means wait forever
+        :return: True if queue is empty, False if deadline is exceeded
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self.__condition:
+            while self.__pending:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self.logger.error(
+                            "{} Zafira calls were not sent in {} seconds"
+                            .format(self.__pending, timeout)
+                        )
+                        return False
+                self.__condition.wait(remaining)
+        return True
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                while not self.__calls:
+                    self.__condition.wait()
+                func, args, kwargs, result = self.__calls.popleft()
+            try:
+                args = [self.__resolve(arg) for arg in args]
+                kwargs = {key: self.__resolve(value)
+                          for key, value in kwargs.items()}
+                result.set_result(func(*args, **kwargs))
+            except Exception as e:
+                self.logger.error("Unable to send queued Zafira call: %s", e)
+                result.set_error(e)
+            finally:
+                with self.__condition:
+                    self.__pending -= 1
+                    self.__condition.notify_all()
+
+    @staticmethod
+    def __resolve(value):
+        if isinstance(value, LazyResult):
+            return value.get()
+        return value
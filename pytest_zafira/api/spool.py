@@ -0,0 +1,352 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+from pytest_zafira.constants import URL_PATH
+from pytest_zafira.exceptions import ZafiraError
+
+from .base_api_request import retry_delay
+from .payloads import to_json_ready
+from .client import ZafiraClient
+
+REF_FORMAT = '$ref:{}'
+DROPPED_KEY_FORMAT = 'dropped.{}'
+REF_PATTERN = re.compile(r'\$ref:([0-9a-f]+\.\d+(?:\.\d+)?)')
+
+
+def is_placeholder_id(value):
+    """
+    :return: True for ids of spooled entities, which are unknown to Zafira
+    """
+    return isinstance(value, str) and value.startswith('$ref:')
+
+
+def is_dropped_id(value):
+    """
+    :return: True for ids of calls dropped while Zafira was unavailable,
+             they are never known to Zafira, unlike spooled ones which
+             are replayed
+    """
+    return is_placeholder_id(value) and \
+        value.startswith(REF_FORMAT.format(DROPPED_KEY_FORMAT.format('')))
+
+
+class SpoolResponse:
+    """
+    Response of a spooled call, has the part of requests.Response
+    used by ZafiraClient callers
+    """
+    status_code = 200
+
+    def __init__(self, body):
+        self.__body = body
+
+    def json(self):
+        return self.__body
+
+
+class Journal:
+    """
+    Append-only JSON lines file with Zafira requests. Every record gets
+    a unique key, entities created by the request are referenced by
+    placeholder ids derived from it until the journal is replayed
+    """
+    FSYNC_POLICIES = ('always', 'interval', 'never')
+
+    def __init__(self, path, fsync='interval', fsync_interval=1.0):
+        """
+        :param path: journal file, appended if exists
+        :param fsync: 'always' syncs every record to disk, 'interval' syncs
+                      at most once per fsync_interval seconds, 'never'
+                      leaves it to OS
+        :param fsync_interval: seconds between syncs in 'interval' policy
+        """
+        if fsync not in self.FSYNC_POLICIES:
+            raise ZafiraError('Unsupported spool fsync policy: {}'.format(
+                fsync
+            ))
+        self.path = path
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        # refs of several sessions appended to one journal never clash
+        self.session = uuid.uuid4().hex[:8]
+        self.__seq = 0
+        self.__synced_at = time.time()
+        self.__lock = threading.Lock()
+        self.__file = None
+
+    @property
+    def records(self):
+        """
+        :return: number of records appended by this session
+        """
+        return self.__seq
+
+    def append(self, method, path, body):
+        """
+        :return: key of the record
+        """
+        with self.__lock:
+            if self.__file is None:
+                # file is created only if something is spooled
+                directory = os.path.dirname(self.path)
+                if directory and not os.path.isdir(directory):
+                    os.makedirs(directory)
+                self.__file = open(self.path, 'a', encoding='utf-8')
+            self.__seq += 1
+            key = '{}.{}'.format(self.session, self.__seq)
+            self.__file.write(json.dumps(
+                {'k': key, 'm': method, 'p': path, 'b': body},
+                separators=(',', ':')
+            ) + '\n')
+            self.__file.flush()
+            now = time.time()
+            if self.fsync == 'always' or (
+                    self.fsync == 'interval' and
+                    now - self.__synced_at >= self.fsync_interval):
+                os.fsync(self.__file.fileno())
+                self.__synced_at = now
+        return key
+
+    def close(self):
+        with self.__lock:
+            if self.__file is None or self.__file.closed:
+                return
+            self.__file.flush()
+            if self.fsync != 'never':
+                os.fsync(self.__file.fileno())
+            self.__file.close()
+
+    @staticmethod
+    def read(path):
+        """
+        Yields records of journal. Torn last line of a crashed session
+        is skipped
+        """
+        with open(path, encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+class SpoolRequest:
+    """
+    APIRequest replacement which appends requests to journal instead of
+    sending them. Responses echo request bodies with placeholder ids.
+    Without journal calls are just dropped
+    """
+
+    def __init__(self, journal=None):
+        self.journal = journal
+        self.__dropped = 0
+        self.__lock = threading.Lock()
+
+    def get(self,
+            endpoint,
+            headers=None,
+            default_err_msg=None,
+            timeout=None):
+        if endpoint == URL_PATH['STATUS_PATH']:
+            return SpoolResponse(None)
+        return self.__spool('GET', endpoint, None)
+
+    def post_without_authorization(self,
+                                   endpoint,
+                                   body=None,
+                                   default_err_msg=None,
+                                   idempotent=False,
+                                   timeout=None):
+        if endpoint == URL_PATH['REFRESH_TOKEN_PATH']:
+            # replay signs in by itself
+            return SpoolResponse({'accessToken': ''})
+        return self.__spool('POST', endpoint, body)
+
+    def post(self,
+             endpoint,
+             body=None,
+             headers=None,
+             default_err_msg=None,
+             idempotent=False,
+             timeout=None):
+        if endpoint == URL_PATH['TEST_CASES_SEARCH_PATH']:
+            return SpoolResponse({'results': [], 'totalResults': 0})
+        return self.__spool('POST', endpoint, body)
+
+    def close(self):
+        if self.journal:
+            self.journal.close()
+
+    def __spool(self, method, endpoint, body):
+        body = to_json_ready(body)
+        if isinstance(body, dict) and 'ciRunId' in body and \
+                body['ciRunId'] is None:
+            # log appenders need ciRunId before the run is replayed
+            body = dict(body, ciRunId=str(uuid.uuid4()))
+        if self.journal:
+            key = self.journal.append(method, endpoint, body)
+        else:
+            with self.__lock:
+                self.__dropped += 1
+                key = DROPPED_KEY_FORMAT.format(self.__dropped)
+
+        if isinstance(body, list) and all(isinstance(item, dict)
+                                          for item in body):
+            return SpoolResponse([
+                dict(item, id=REF_FORMAT.format('{}.{}'.format(key, i)))
+                for i, item in enumerate(body)
+            ])
+        response = dict(body) if isinstance(body, dict) else {}
+        response['id'] = REF_FORMAT.format(key)
+        return SpoolResponse(response)
+
+
+class SpoolClient(ZafiraClient):
+    """
+    ZafiraClient which never talks to Zafira: all calls are written to
+    local journal to be uploaded later by zafira-replay
+    """
+
+    def __init__(self, journal):
+        self.access_token = ''
+        self.api = SpoolRequest(journal)
+
+    def close(self):
+        # journal is closed by its owner, it may be shared with fallback
+        pass
+
+
+class JournalReplayer:
+    """
+    Uploads journal to Zafira. Progress is kept in state file, so replay
+    interrupted by an error continues from the failed record, and a test
+    is started only once per ciTestId
+    """
+
+    logger = logging.getLogger('zafira')
+
+    def __init__(self, api, state_path, retries=5, backoff=1.0):
+        """
+        :param api: authorized APIRequest
+        :param state_path: replay state file, created if missing
+        :param retries: attempts to send a record before giving up
+        :param backoff: initial delay between attempts in seconds, doubled
+                        after every failed attempt
+        """
+        self.api = api
+        self.access_token = ''
+        self.state_path = state_path
+        self.retries = retries
+        self.backoff = backoff
+        self.done = set()
+        self.ids = {}
+        self.tests = {}
+
+    def load_state(self):
+        if not os.path.exists(self.state_path):
+            return self
+        for record in Journal.read(self.state_path):
+            self.done.add(record['k'])
+            self.ids.update(record.get('ids') or {})
+            if record.get('t') is not None:
+                self.tests[record['t']] = record['ids'][record['k']]
+        return self
+
+    def replay(self, journal_path):
+        """
+        :return: (number of sent records, number of skipped records)
+        """
+        sent = skipped = 0
+        with open(self.state_path, 'a', encoding='utf-8') as state:
+            for record in Journal.read(journal_path):
+                key = record['k']
+                if key in self.done:
+                    skipped += 1
+                    continue
+                ci_test_id = self.__ci_test_id(record)
+                if ci_test_id in self.tests:
+                    ids = {key: self.tests[ci_test_id]}
+                    skipped += 1
+                else:
+                    ids = self.__map_ids(key, self.__send(record))
+                    sent += 1
+                self.ids.update(ids)
+                if ci_test_id is not None:
+                    self.tests[ci_test_id] = ids.get(key)
+                self.done.add(key)
+                state.write(json.dumps(
+                    {'k': key, 'ids': ids, 't': ci_test_id},
+                    separators=(',', ':')
+                ) + '\n')
+                state.flush()
+        return sent, skipped
+
+    @staticmethod
+    def __ci_test_id(record):
+        body = record['b']
+        if record['p'] == URL_PATH['TESTS_PATH'] and isinstance(body, dict):
+            return body.get('ciTestId')
+        return None
+
+    @staticmethod
+    def __map_ids(key, body):
+        if isinstance(body, list):
+            return {'{}.{}'.format(key, i): item.get('id')
+                    for i, item in enumerate(body)
+                    if isinstance(item, dict)}
+        if isinstance(body, dict):
+            return {key: body.get('id')}
+        return {}
+
+    def __send(self, record):
+        path = self.__resolve(record['p'])
+        body = self.__resolve(record['b'])
+        headers = {'Authorization': 'Bearer ' + self.access_token}
+        attempt = 0
+        while True:
+            try:
+                if record['m'] == 'GET':
+                    response = self.api.get(path, headers)
+                else:
+                    response = self.api.post(path, body, headers)
+                try:
+                    return response.json()
+                except ValueError:
+                    return None
+            except Exception as e:
+                attempt += 1
+                if attempt >= self.retries:
+                    raise ZafiraError('Unable to replay {} {}: {}'.format(
+                        record['m'], path, e
+                    ))
+                delay = retry_delay(attempt, self.backoff)
+                self.logger.warning(
+                    'Replay of {} {} failed, retry in {:.1f} seconds: {}'
+                    .format(record['m'], path, delay, e)
+                )
+                time.sleep(delay)
+
+    def __resolve(self, value):
+        """
+        Replaces placeholder ids with ids of replayed entities
+        """
+        if isinstance(value, dict):
+            return {key: self.__resolve(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.__resolve(item) for item in value]
+        if not isinstance(value, str) or '$ref:' not in value:
+            return value
+        match = REF_PATTERN.match(value)
+        if match and match.end() == len(value):
+            return self.__id(match.group(1))
+        return REF_PATTERN.sub(lambda m: str(self.__id(m.group(1))), value)
+
+    def __id(self, ref):
+        if ref not in self.ids:
+            raise ZafiraError('Unknown journal reference: ' + ref)
+        return self.ids[ref]
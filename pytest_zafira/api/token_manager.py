@@ -0,0 +1,203 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # no locking on Windows: processes may refresh token at the same time
+    fcntl = None
+
+from pytest_zafira.exceptions import ZafiraError
+
+# delay before next attempt if background refresh fails
+RETRY_INTERVAL = 10
+
+
+class TokenManager:
+    """
+    Keeps access token of a client valid: refreshes it before expiry on a
+    background thread and on demand when Zafira rejects a call with 401.
+    Token is shared with other processes (xdist, parallel CI jobs) by
+    cache file, so only one of them signs in while the token is valid
+    """
+    logger = logging.getLogger('zafira')
+
+    def __init__(self, client, refresh_token, cache_file=None,
+                 refresh_margin=60, cache_key=None):
+        """
+        :param client: ZafiraClient, AsyncClientBridge or any object with
+                       refresh_token method and access_token attribute
+        :param refresh_token: long-lived token from Zafira dashboard
+        :param cache_file: path to file shared by processes, no sharing if
+                           None
+        :param refresh_margin: seconds before expiry to refresh token
+        :param cache_key: identifies Zafira instance in cache file, e.g.
+                          service url
+        """
+        self.client = client
+        self.refresh_token = refresh_token
+        self.cache_file = cache_file
+        self.refresh_margin = refresh_margin
+        self.cache_key = hashlib.sha256(
+            '{}\n{}'.format(cache_key, refresh_token).encode('utf-8')
+        ).hexdigest()
+        self.access_token = None
+        self.expires_at = None
+        self.__lock = threading.RLock()
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+    def start(self):
+        """
+        Gets valid token, from cache file or Zafira, and starts background
+        refresh
+        :return: access token
+        """
+        token = self.refresh()
+        self.__thread = threading.Thread(target=self.__refresh_loop,
+                                         name='ZafiraTokenRefresher')
+        self.__thread.daemon = True
+        self.__thread.start()
+        return token
+
+    def stop(self):
+        self.__stopped.set()
+
+    def reauthorize(self, authorization):
+        """
+        Called by APIRequest when call is rejected with 401
+        :param authorization: Authorization header of the rejected call
+        :return: Authorization header to repeat the call with, None if
+                 token can't be refreshed
+        """
+        stale_token = authorization.split(' ', 1)[-1]
+        try:
+            return 'Bearer ' + self.refresh(stale_token)
+        except ZafiraError as e:
+            self.logger.error("Unable to refresh Zafira token: %s", e)
+            return None
+
+    def refresh(self, stale_token=None):
+        """
+        :param stale_token: token which is known to be expired or
+                            rejected, it is never reused
+        :return: valid access token
+        """
+        with self.__lock:
+            if stale_token is not None and self.access_token and \
+                    stale_token != self.access_token:
+                # refreshed by another thread meanwhile
+                return self.access_token
+            with self.__cache_lock():
+                cached = self.__read_cache()
+                if cached and cached['accessToken'] != stale_token and \
+                        self.__is_valid(cached['expiresAt']):
+                    self.logger.debug("Zafira token is taken from cache")
+                    self.__use(cached['accessToken'], cached['expiresAt'])
+                    return self.access_token
+
+                response = self.client.refresh_token(
+                    self.refresh_token
+                ).json()
+                token = response.get('accessToken')
+                if not token:
+                    raise ZafiraError("Zafira returned no access token")
+                expires_in = response.get('expiresIn')
+                self.__use(token, time.time() + expires_in
+                           if expires_in else None)
+                self.__write_cache()
+                return self.access_token
+
+    def __use(self, token, expires_at):
+        self.access_token = token
+        self.expires_at = expires_at
+        self.client.access_token = token
+
+    def __is_valid(self, expires_at):
+        return expires_at is None or \
+            expires_at - self.refresh_margin > time.time()
+
+    def __refresh_loop(self):
+        delay = self.__next_refresh_delay()
+        while not self.__stopped.wait(delay):
+            try:
+                self.refresh(self.access_token)
+                delay = self.__next_refresh_delay()
+            except Exception as e:
+                self.logger.error("Unable to refresh Zafira token: %s", e)
+                delay = RETRY_INTERVAL
+
+    def __next_refresh_delay(self):
+        if self.expires_at is None:
+            # expiry is unknown, token is refreshed on 401 only
+            return None
+        return max(self.expires_at - self.refresh_margin - time.time(), 0)
+
+    @contextlib.contextmanager
+    def __cache_lock(self):
+        # the lock is held while token is refreshed, so processes waiting
+        # for it find the new token in cache
+        lock = None
+        if self.cache_file is not None and fcntl is not None:
+            try:
+                self.__ensure_directory()
+                lock = open(self.cache_file + '.lock', 'a')
+            except OSError as e:
+                self.logger.warning(
+                    "Unable to lock Zafira token cache: %s", e
+                )
+        if lock is None:
+            yield
+            return
+        with lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def __read_cache(self):
+        if self.cache_file is None:
+            return None
+        try:
+            with open(self.cache_file) as f:
+                return json.load(f).get(self.cache_key)
+        except (IOError, ValueError, AttributeError):
+            return None
+
+    def __write_cache(self):
+        if self.cache_file is None:
+            return
+        try:
+            with open(self.cache_file) as f:
+                tokens = json.load(f)
+        except (IOError, ValueError):
+            tokens = {}
+        now = time.time()
+        # drop tokens of other Zafira instances which expired
+        tokens = {key: value for key, value in tokens.items()
+                  if isinstance(value, dict) and
+                  (value.get('expiresAt') or now) >= now}
+        tokens[self.cache_key] = {'accessToken': self.access_token,
+                                  'expiresAt': self.expires_at}
+        self.__ensure_directory()
+        temp_file = '{}.{}.tmp'.format(self.cache_file, os.getpid())
+        try:
+            # token is a secret, so the file is readable by owner only
+            fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                         0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(tokens, f)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            self.logger.warning("Unable to cache Zafira token: %s", e)
+
+    def __ensure_directory(self):
+        directory = os.path.dirname(self.cache_file)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
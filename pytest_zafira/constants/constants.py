@@ -5,6 +5,8 @@ URL_PATH = {
     'PROFILE_PATH': '/api/users/profile',
     'TEST_SUITES_PATH': '/api/tests/suites',
     'TEST_CASES_PATH': '/api/tests/cases',
+    'TEST_CASES_SEARCH_PATH': '/api/tests/cases/search',
+    'TEST_CASES_BATCH_PATH': '/api/tests/cases/batch',
     'JOBS_PATH': '/api/jobs',
     'TEST_RUNS_PATH': '/api/tests/runs',
     'TESTS_PATH': '/api/tests',
@@ -53,7 +55,58 @@ PARAMETER = {
     'AWS_ACCESS_KEY': 'aws_access_key',
     'AWS_SECRET_KEY': 'aws_secret_key',
     'AWS_SCREEN_SHOT_BUCKET': 'aws_screen_shot_bucket',
-    'S3_SAVE_SCREENSHOTS': 's3_save_screenshots'
+    'S3_SAVE_SCREENSHOTS': 's3_save_screenshots',
+    'AWS_MAX_POOL_CONNECTIONS': 'aws_max_pool_connections',
+    'SCREENSHOT_UPLOAD_WORKERS': 'screenshot_upload_workers',
+    'SCREENSHOT_UPLOAD_QUEUE_SIZE': 'screenshot_upload_queue_size',
+    'SCREENSHOT_UPLOAD_TIMEOUT': 'screenshot_upload_timeout',
+    'ARTIFACT_MULTIPART_THRESHOLD': 'artifact_multipart_threshold',
+    'ARTIFACT_MULTIPART_CHUNKSIZE': 'artifact_multipart_chunksize',
+    'ARTIFACT_UPLOAD_CONCURRENCY': 'artifact_upload_concurrency',
+    'SCREENSHOT_FORMAT': 'screenshot_format',
+    'SCREENSHOT_MAX_WIDTH': 'screenshot_max_width',
+    'SCREENSHOT_QUALITY': 'screenshot_quality',
+    'SCREENSHOT_DEDUP': 'screenshot_dedup',
+    'SCREENSHOT_MAX_TOTAL_BYTES': 'screenshot_max_total_bytes',
+    'REPORTING_MODE': 'reporting_mode',
+    'REPORTING_DRAIN_TIMEOUT': 'reporting_drain_timeout',
+    'SPOOL_FILE': 'spool_file',
+    'SPOOL_FSYNC': 'spool_fsync',
+    'SPOOL_FSYNC_INTERVAL': 'spool_fsync_interval',
+    'SPOOL_ON_UNAVAILABLE': 'spool_on_unavailable',
+    'HTTP_POOL_SIZE': 'http_pool_size',
+    'HTTP_CONNECT_TIMEOUT': 'http_connect_timeout',
+    'HTTP_READ_TIMEOUT': 'http_read_timeout',
+    'HTTP_GZIP_REQUESTS': 'http_gzip_requests',
+    'HTTP_CLIENT': 'http_client',
+    'HTTP_RETRIES': 'http_retries',
+    'HTTP_RETRY_BACKOFF': 'http_retry_backoff',
+    'HTTP_RETRY_MAX_BACKOFF': 'http_retry_max_backoff',
+    'CIRCUIT_BREAKER_THRESHOLD': 'circuit_breaker_threshold',
+    'CIRCUIT_BREAKER_RESET_TIMEOUT': 'circuit_breaker_reset_timeout',
+    'TOKEN_CACHE': 'token_cache',
+    'TOKEN_CACHE_FILE': 'token_cache_file',
+    'TOKEN_REFRESH_MARGIN': 'token_refresh_margin',
+    'FAILURE_MESSAGE_MAX_LENGTH': 'failure_message_max_length',
+    'FAILURE_MESSAGE_TAIL_LENGTH': 'failure_message_tail_length',
+    'FAILURE_TRACE_UPLOAD': 'failure_trace_upload',
+    'KNOWN_ISSUES_FILE': 'known_issues_file',
+    'KNOWN_ISSUES_ENDPOINT': 'known_issues_endpoint',
+    'METRICS': 'metrics',
+    'METRICS_FILE': 'metrics_file',
+    'TEST_CASE_CACHE': 'test_case_cache',
+    'TEST_CASE_CACHE_FILE': 'test_case_cache_file',
+    'TEST_CASE_CACHE_SIZE': 'test_case_cache_size',
+    'TEST_CASE_PREREGISTRATION': 'test_case_preregistration',
+    'TEST_CASE_BATCH_SIZE': 'test_case_batch_size',
+    'TEST_CASE_REGISTRATION_CONCURRENCY':
+        'test_case_registration_concurrency',
+    'RABBITMQ_ASYNC': 'rabbitmq_async',
+    'RABBITMQ_BUFFER_SIZE': 'rabbitmq_buffer_size',
+    'RABBITMQ_BATCH_SIZE': 'rabbitmq_batch_size',
+    'RABBITMQ_OVERFLOW_POLICY': 'rabbitmq_overflow_policy',
+    'RABBITMQ_SPILL_FILE': 'rabbitmq_spill_file',
+    'RABBITMQ_FLUSH_TIMEOUT': 'rabbitmq_flush_timeout'
 }
 
 
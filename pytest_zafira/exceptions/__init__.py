@@ -9,6 +9,15 @@ class ConfigError(ZafiraError):
 class APIError(ZafiraError):
     """ An exception for Zafira client API calls issues """
 
+    def __init__(self, *args, status_code=None):
+        super(APIError, self).__init__(*args)
+        # HTTP status of rejected call, None if Zafira didn't respond
+        self.status_code = status_code
+
+
+class CircuitOpenError(APIError):
+    """ Raises if Zafira calls are stopped after repeated failures """
+
 
 class LoggingError(ZafiraError):
     """ Raises if issue in log appender occurs """
@@ -0,0 +1,70 @@
+import argparse
+import logging
+import sys
+
+from pytest_zafira.constants import URL_PATH
+from pytest_zafira.exceptions import ZafiraError
+from pytest_zafira.utils.context import Context
+from pytest_zafira.api.api_request import APIRequest
+from pytest_zafira.api.spool import JournalReplayer
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='zafira-replay',
+        description='Uploads journal written in spool reporting mode '
+                    'to Zafira'
+    )
+    parser.add_argument('journal', nargs='?',
+                        help='journal file, spool_file option by default')
+    parser.add_argument('--url',
+                        help='Zafira service url, service-url by default')
+    parser.add_argument('--token',
+                        help='Zafira access token, access_token by default')
+    parser.add_argument('--state',
+                        help='replay state file, <journal>.state by default')
+    parser.add_argument('--retries', type=int, default=5,
+                        help='attempts to send a record')
+    parser.add_argument('--backoff', type=float, default=1.0,
+                        help='initial delay between attempts in seconds')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    args = parse_args(argv)
+    settings = Context.settings()
+    journal = args.journal or settings.spool_file
+    url = args.url or settings.service_url
+    token = args.token or settings.access_token
+
+    api = APIRequest(url, connect_timeout=10, read_timeout=60)
+    replayer = JournalReplayer(api,
+                               args.state or journal + '.state',
+                               args.retries,
+                               args.backoff).load_state()
+    try:
+        replayer.access_token = api.post_without_authorization(
+            URL_PATH['REFRESH_TOKEN_PATH'],
+            {'refreshToken': token},
+            'Unable to refresh token'
+        ).json()['accessToken']
+        sent, skipped = replayer.replay(journal)
+    except (ZafiraError, IOError) as e:
+        logging.getLogger('zafira').error(
+            'Replay is interrupted, run it again to continue: %s', e
+        )
+        return 1
+    finally:
+        api.close()
+
+    logging.getLogger('zafira').info(
+        'Replayed {} records of {}, {} were already sent'.format(
+            sent, journal, skipped
+        )
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
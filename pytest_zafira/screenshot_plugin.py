@@ -1,57 +1,70 @@
 import pytest
 import logging
 import itertools
-from concurrent.futures import ThreadPoolExecutor
 
-from pytest_zafira.utils import DriverProvider
+from pytest_zafira.utils import DriverProvider, session_upload_executor
 from pytest_zafira.utils.screenshot import Screenshot
-from pytest_zafira.services import amazon_cloud_service
+from pytest_zafira import services
+from pytest_zafira.zafira_plugin import PyTestZafiraPlugin
 
 
 class ZafiraScreenshotCapture:
 
-    amazon_connector = amazon_cloud_service
     driver_provider = None
     logger = logging.getLogger('zafira')
 
+    @property
+    def amazon_connector(self):
+        return services.amazon_cloud_service
+
     @pytest.hookimpl
     def pytest_runtest_makereport(self, item, call):
         """
-        Catches a screenshot as bytearray and saves it into s3 bucket when an
+        Catches a screenshot as PNG bytes and saves it into s3 bucket when an
         exception occurs
         :param item: info about running test and its instance of and
                      instanceof params
         :param call: info about call
         :return:
         """
-        with ThreadPoolExecutor() as executor:
-            if not self.on_exception(item, call):
-                return
+        if not self.on_exception(item, call):
+            return
+
+        self.logger.debug('Exception occurs... '
+                          'Trying to catch screenshot')
+
+        # uploading threads don't share context of the test
+        test_id = PyTestZafiraPlugin().get_ci_test_id(item.nodeid)
+        executor = self.get_upload_executor()
 
-            self.logger.debug('Exception occurs... '
-                              'Trying to catch screenshot')
+        if hasattr(item.instance, 'driver'):
+            executor.submit(
+                Screenshot.upload_png_to_amazon_S3,
+                item.instance.driver.get_screenshot_as_png(),
+                test_id
+            )
+        elif hasattr(item.instance, 'drivers'):
+            failed_drivers = self.get_failed_drivers(
+                list(item.instance.drivers.values()),
+                call
+            )
 
-            if hasattr(item.instance, 'driver'):
+            drivers = DriverProvider(failed_drivers).get_drivers()
+
+            for driver in drivers:
                 executor.submit(
-                    Screenshot.upload_to_amazon_S3,
-                    bytes(
-                        item.instance.driver.get_screenshot_as_base64(),
-                        'utf-8'
-                    )
-                )
-            elif hasattr(item.instance, 'drivers'):
-                failed_drivers = self.get_failed_drivers(
-                    list(item.instance.drivers.values()),
-                    call
+                    Screenshot.upload_png_to_amazon_S3,
+                    driver.get_screenshot_as_png(),
+                    test_id
                 )
 
-                drivers = DriverProvider(failed_drivers).get_drivers()
-
-                for driver in drivers:
-                    executor.submit(
-                        Screenshot.upload_to_amazon_S3,
-                        bytes(driver.get_screenshot_as_base64(), 'utf-8')
-                    )
+    @staticmethod
+    def get_upload_executor():
+        """
+        :return: UploadExecutor shared by all uploads of the session, it's
+                 drained by Zafira plugin before the test run is finished
+        """
+        return session_upload_executor()
 
     @staticmethod
     def on_exception(item, call):
@@ -1,4 +1,9 @@
-from .amazon_service import amazon_cloud_service
+from pytest_zafira.utils.lazy import lazy_exports
 
 
 __all__ = ['amazon_cloud_service']
+
+# boto3 is imported with the first use of S3
+__getattr__ = lazy_exports(__name__, (
+    ('amazon_cloud_service', '.amazon_service', 'amazon_cloud_service'),
+))
@@ -1,9 +1,55 @@
 import boto3
 import logging
 import base64
+import io
+import mimetypes
+import threading
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 
 from pytest_zafira.utils.context import Context
-from pytest_zafira.constants import PARAMETER
+from pytest_zafira.utils.metrics import metrics
+
+
+class MemoryviewReader(io.RawIOBase):
+    """
+    Read-only seekable stream over memoryview, only requested slices of
+    the buffer are copied, unlike io.BytesIO which copies it as a whole
+    """
+
+    def __init__(self, view):
+        self.__view = memoryview(view).cast('B')
+        self.__position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def read(self, size=-1):
+        end = len(self.__view) if size is None or size < 0 else \
+            self.__position + size
+        chunk = self.__view[self.__position:end].tobytes()
+        self.__position += len(chunk)
+        return chunk
+
+    def readinto(self, buffer):
+        chunk = self.__view[self.__position:self.__position + len(buffer)]
+        buffer[:len(chunk)] = chunk
+        self.__position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.__position
+        elif whence == io.SEEK_END:
+            offset += len(self.__view)
+        self.__position = max(0, offset)
+        return self.__position
+
+    def tell(self):
+        return self.__position
 
 
 class AmazoneCloudService:
@@ -13,9 +59,28 @@ class AmazoneCloudService:
     logger = logging.getLogger('zafira')
 
     def __init__(self):
-        self.aws_access_key = Context.get(PARAMETER['AWS_ACCESS_KEY'])
-        self.aws_secret_access_key = Context.get(PARAMETER['AWS_SECRET_KEY'])
-        self.bucket = Context.get(PARAMETER['AWS_SCREEN_SHOT_BUCKET'])
+        self.__lock = threading.RLock()
+        self.__session = None
+        self.__client = None
+        self.__transfer_config = None
+        # boto3 resources are not thread safe, so each thread has its own
+        self.__local = threading.local()
+
+    @property
+    def bucket(self):
+        return Context.settings().aws_screen_shot_bucket
+
+    @property
+    def transfer_config(self):
+        if self.__transfer_config is None:
+            settings = Context.settings()
+            self.__transfer_config = TransferConfig(
+                multipart_threshold=settings.artifact_multipart_threshold,
+                multipart_chunksize=settings.artifact_multipart_chunksize,
+                max_concurrency=settings.artifact_upload_concurrency,
+                use_threads=True
+            )
+        return self.__transfer_config
 
     def generate_amazon_presigned_URL(self, key, expires_in=86400):
         """
@@ -32,6 +97,75 @@ class AmazoneCloudService:
         self.logger.debug('Presigned URL to image:' + url)
         return url
 
+    def upload_image(self, image, key, acl='private',
+                     content_type='image/png'):
+        """
+        Upload image from memory without re-encoding it
+        :param image: bytes, memoryview or binary file object
+        :param key: Key to recognize file in bucket
+        :param acl: access to file. 'Private' by default
+        :param content_type: MIME type of image
+        """
+        extra_args = {'ContentType': content_type, 'ACL': acl}
+        with metrics.timer('s3', 'upload_image'):
+            if hasattr(image, 'read'):
+                # streams the object without building another copy of it
+                self.get_aws_s3_client().upload_fileobj(
+                    image,
+                    self.bucket,
+                    key,
+                    ExtraArgs=extra_args
+                )
+            else:
+                if isinstance(image, memoryview):
+                    image = MemoryviewReader(image)
+                self.get_aws_s3_client().put_object(Bucket=self.bucket,
+                                                    Key=key,
+                                                    Body=image,
+                                                    **extra_args)
+        self.logger.debug('File was uploaded to S3')
+
+    def upload_artifact(self,
+                        path_or_stream,
+                        key,
+                        content_type=None,
+                        acl='private',
+                        content_encoding=None):
+        """
+        Upload file of any size. Content is streamed from disk or stream,
+        files above multipart threshold are sent as multipart upload with
+        parts uploaded in parallel
+        :param path_or_stream: path to file or binary file object
+        :param key: Key to recognize file in bucket
+        :param content_type: MIME type, guessed from key if omitted
+        :param acl: access to file. 'Private' by default
+        :param content_encoding: e.g. 'gzip' for compressed content,
+                                 which browsers decompress on download
+        """
+        content_type = content_type or \
+            mimetypes.guess_type(key)[0] or 'application/octet-stream'
+        extra_args = {'ContentType': content_type, 'ACL': acl}
+        if content_encoding:
+            extra_args['ContentEncoding'] = content_encoding
+        with metrics.timer('s3', 'upload_artifact'):
+            if hasattr(path_or_stream, 'read'):
+                self.get_aws_s3_client().upload_fileobj(
+                    path_or_stream,
+                    self.bucket,
+                    key,
+                    ExtraArgs=extra_args,
+                    Config=self.transfer_config
+                )
+            else:
+                self.get_aws_s3_client().upload_file(
+                    path_or_stream,
+                    self.bucket,
+                    key,
+                    ExtraArgs=extra_args,
+                    Config=self.transfer_config
+                )
+        self.logger.debug('Artifact was uploaded to S3: ' + key)
+
     def upload_image_from_base64(self, base64_string, key, acl='private'):
         """
         Upload byte array from local machine to s3 storage
@@ -40,7 +174,8 @@ class AmazoneCloudService:
         :param acl: access to file. 'Private' by default
         """
         dec = base64.b64decode(base64_string)
-        self.get_aws_s3_resource().Bucket(self.bucket).put_object(
+        self.get_aws_s3_client().put_object(
+            Bucket=self.bucket,
             Key=key,
             Body=dec,
             ContentEncoding='base64',
@@ -50,18 +185,49 @@ class AmazoneCloudService:
 
     def get_aws_s3_client(self):
         """
+        S3 client is created once and shared by all threads
         :return: client
         """
-        return boto3.client('s3', aws_access_key_id=self.aws_access_key,
-                            aws_secret_access_key=self.aws_secret_access_key)
+        if self.__client is None:
+            with self.__lock:
+                if self.__client is None:
+                    settings = Context.settings()
+                    timeout = settings.screenshot_upload_timeout
+                    self.__client = self.__get_session().client(
+                        's3',
+                        config=Config(
+                            max_pool_connections=(
+                                settings.aws_max_pool_connections
+                            ),
+                            connect_timeout=timeout,
+                            read_timeout=timeout
+                        )
+                    )
+        return self.__client
 
     def get_aws_s3_resource(self):
         """
-        Return aws s3 resource
+        Return aws s3 resource, created once per thread
         :return: resource
         """
-        return boto3.resource('s3', aws_access_key_id=self.aws_access_key,
-                              aws_secret_access_key=self.aws_secret_access_key)
+        resource = getattr(self.__local, 'resource', None)
+        if resource is None:
+            session = self.__get_session()
+            with self.__lock:
+                resource = session.resource('s3')
+            self.__local.resource = resource
+        return resource
+
+    def __get_session(self):
+        if self.__session is None:
+            with self.__lock:
+                if self.__session is None:
+                    settings = Context.settings()
+                    self.__session = boto3.session.Session(
+                        aws_access_key_id=settings.aws_access_key,
+                        aws_secret_access_key=settings.aws_secret_key
+                    )
+        return self.__session
 
 
 amazon_cloud_service = AmazoneCloudService()
@@ -0,0 +1,98 @@
+import logging
+import time
+
+from pytest_zafira.utils import Context
+from pytest_zafira.utils.json_backend import JSON_BACKEND, dumps  # noqa
+
+
+class LogstashFormatter(logging.Formatter):
+    """
+    Custom logging JSON formatter, contains methods to format log record in
+    logstash-compatible format
+    """
+    __save_screenshots = None
+
+    def __init__(self, *args, **kwargs):
+        logging.Formatter.__init__(self, *args, **kwargs)
+        # subclasses add fields by overriding write_* methods, they are
+        # called instead of building the message by a single literal
+        cls = type(self)
+        self.__custom_fields = \
+            cls.write_basic is not LogstashFormatter.write_basic or \
+            cls.write_with_headers is not LogstashFormatter.write_with_headers
+
+    @classmethod
+    def serialize(cls, message):
+        return dumps(message)
+
+    @classmethod
+    def save_screenshots(cls):
+        """
+        :return: s3_save_screenshots option, read once per process
+        """
+        if cls.__save_screenshots is None:
+            cls.__save_screenshots = Context.settings().s3_save_screenshots
+        return cls.__save_screenshots
+
+    def format(self, record):
+        """
+        Formats log record into logstash-compatible format
+        :return: JSON representation of log record
+        """
+        if self.__custom_fields:
+            message = {}
+            self.write_basic(message, record)
+            if 'META_INFO' == record.levelname and self.save_screenshots():
+                self.write_with_headers(message, record)
+            return self.serialize(message)
+        message = {
+            'timestamp': time.time() * 1000,
+            'threadName': normalized_thread_name(record.threadName),
+            'logger': record.name,
+            'message': record.msg,
+            'level': record.levelname
+        }
+        if 'META_INFO' == record.levelname and self.save_screenshots():
+            message['headers'] = {
+                'AMAZON_PATH': record.amazon_path,
+                'CI_TEST_ID': record.test_id,
+                'AMAZON_PATH_CORRELATION_ID': record.correlation_id
+            }
+        return dumps(message)
+
+    def write_basic(self, message, record):
+        message.update({
+            'timestamp': time.time() * 1000,
+            'threadName': normalized_thread_name(record.threadName),
+            'logger': record.name,
+            'message': record.msg,
+            'level': record.levelname
+        })
+
+    def write_with_headers(self, message, record):
+        message['headers'] = {
+            'AMAZON_PATH': record.amazon_path,
+            'CI_TEST_ID': record.test_id,
+            'AMAZON_PATH_CORRELATION_ID': record.correlation_id
+        }
+
+
+_thread_names = {}
+_MAX_THREAD_NAMES = 1024
+
+
+def normalized_thread_name(thread_name):
+    """
+    Simplifies a long names of thread (for Zafira UI),
+    e.g. MainThread -> MT, ThreadPoolExecutor -> TPE, etc.
+    Simplified names are memoized, there are only few threads per process
+    :param thread_name: thread name from Log Record object
+    :return: simplified thread name
+    """
+    normalized = _thread_names.get(thread_name)
+    if normalized is None:
+        normalized = ''.join(symb for symb in thread_name if symb.isupper())
+        if len(_thread_names) >= _MAX_THREAD_NAMES:
+            _thread_names.clear()
+        _thread_names[thread_name] = normalized
+    return normalized
@@ -1,8 +1,9 @@
 import logging
+import os
 import threading
 import json
+from collections import deque
 from datetime import datetime
-import time
 import pika
 from pika import credentials
 from pika.exceptions import AMQPConnectionError, AMQPChannelError
@@ -11,17 +12,162 @@ from pytest_zafira.exceptions import APIError
 from pytest_zafira.api import zafira_client
 from pytest_zafira import ZafiraListener
 from pytest_zafira.utils import Context
-from pytest_zafira.constants import PARAMETER
+from pytest_zafira.utils.metrics import metrics
+
+from .logstash_formatter import (LogstashFormatter, # noqa
+                                 normalized_thread_name)
+
+
+class LogBuffer:
+    """
+    Bounded buffer of formatted log messages waiting to be published.
+    When buffer is full, new message is handled according to overflow
+    policy: 'drop_oldest' discards the oldest buffered message, 'block'
+    waits for free space, 'spill' appends message to a file which is
+    read back by buffer-sized chunks once the buffer is drained. While
+    spilled messages are pending, new ones are spilled after them, so
+    messages are published in the order they were logged
+    """
+    DROP_OLDEST = 'drop_oldest'
+    BLOCK = 'block'
+    SPILL = 'spill'
+
+    BLOCK_TIMEOUT = 5
+
+    def __init__(self, size, overflow_policy=DROP_OLDEST, spill_file=None):
+        self.size = size
+        self.overflow_policy = overflow_policy
+        self.spill_file = spill_file
+        self.dropped = 0
+        self.__reported_dropped = 0
+        self.__messages = deque()
+        self.__in_flight = 0
+        self.__spilled = False
+        # position of the first spilled message not read back yet
+        self.__spill_offset = 0
+        self.__condition = threading.Condition()
+
+    def put(self, message, wait=True):
+        """
+        :param message: (body, correlation id) pair
+        :param wait: allows to wait for free space with 'block' policy
+        """
+        with self.__condition:
+            if self.__spilled:
+                self.__spill(message)
+                return
+            if len(self.__messages) >= self.size:
+                if self.overflow_policy == self.BLOCK and wait:
+                    self.__condition.wait_for(
+                        lambda: len(self.__messages) < self.size,
+                        self.BLOCK_TIMEOUT
+                    )
+                elif self.overflow_policy == self.SPILL and self.spill_file:
+                    self.__spill(message)
+                    return
+            if len(self.__messages) >= self.size:
+                self.__messages.popleft()
+                self.dropped += 1
+            self.__messages.append(message)
+            self.__condition.notify_all()
+
+    def take(self, max_count, timeout):
+        """
+        Waits for messages and takes up to max_count of them. Taken
+        messages are in flight until done() is called
+        :return: list of messages, may be empty if timeout expired
+        """
+        with self.__condition:
+            if not self.__messages and self.__spilled:
+                self.__restore()
+            if not self.__messages:
+                self.__condition.wait(timeout)
+            count = min(max_count, len(self.__messages))
+            batch = [self.__messages.popleft() for _ in range(count)]
+            self.__in_flight += count
+            self.__condition.notify_all()
+            return batch
+
+    def done(self, count, dropped=0):
+        """
+        Finishes messages taken by take()
+        :param dropped: number of them which were not published
+        """
+        with self.__condition:
+            self.__in_flight -= count
+            self.dropped += dropped
+            self.__condition.notify_all()
+
+    def pop_dropped(self):
+        """
+        :return: number of messages dropped since the previous call
+        """
+        with self.__condition:
+            dropped = self.dropped - self.__reported_dropped
+            self.__reported_dropped = self.dropped
+            return dropped
+
+    def wait_empty(self, timeout):
+        """
+        :return: True if all messages were published in time
+        """
+        with self.__condition:
+            return self.__condition.wait_for(
+                lambda: not self.__messages and not self.__in_flight and
+                not self.__spilled,
+                timeout
+            )
+
+    def __spill(self, message):
+        body, correlation_id = message
+        directory = os.path.dirname(self.spill_file)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(self.spill_file, 'a') as f:
+            f.write(json.dumps([body.decode('utf-8'), correlation_id]))
+            f.write('\n')
+        self.__spilled = True
+
+    def __restore(self):
+        """
+        Reads the next chunk of spilled messages, at most buffer size
+        """
+        try:
+            with open(self.spill_file) as f:
+                f.seek(self.__spill_offset)
+                # readline() keeps tell() usable, unlike iteration
+                for line in iter(f.readline, ''):
+                    body, correlation_id = json.loads(line)
+                    self.__messages.append((body.encode('utf-8'),
+                                            correlation_id))
+                    if len(self.__messages) >= self.size:
+                        break
+                self.__spill_offset = f.tell()
+                exhausted = not f.readline()
+        except (IOError, OSError, ValueError):
+            exhausted = True
+        if exhausted:
+            self.__spilled = False
+            self.__spill_offset = 0
+            try:
+                os.remove(self.spill_file)
+            except OSError:
+                pass
 
 
 class RabbitHandler(logging.Handler):
     """
     handler that send log to rabbitmq, using pika.
+    In async mode records are put into LogBuffer and published by batches
+    from a dedicated thread, so logging never waits for RabbitMQ
     """
     logger = logging.getLogger('zafira')
 
+    PUBLISH_INTERVAL = 0.5
+
     def __init__(self):
         logging.Handler.__init__(self)
+        self.logstash_formatter = LogstashFormatter()
         self.zafira_connected = self.__connect_to_zafira()
         self.exchange = 'logs'
         self.connection = None
@@ -42,7 +188,25 @@ class RabbitHandler(logging.Handler):
             credentials=credentials.PlainCredentials(self.username,
                                                      self.password)
         )
-        self.activate_options()
+        settings = Context.settings()
+        self.async_mode = settings.rabbitmq_async
+        self.buffer = None
+        self.publisher = None
+        if self.async_mode:
+            self.batch_size = settings.rabbitmq_batch_size
+            self.buffer = LogBuffer(
+                settings.rabbitmq_buffer_size,
+                settings.rabbitmq_overflow_policy,
+                settings.rabbitmq_spill_file
+            )
+            self.routing_key = ZafiraListener().get_ci_run_id()
+            if self.zafira_connected:
+                self.publisher = threading.Thread(target=self.__publish_loop,
+                                                  name='ZafiraLogPublisher')
+                self.publisher.daemon = True
+                self.publisher.start()
+        else:
+            self.activate_options()
 
     def activate_options(self):
         """
@@ -82,23 +246,33 @@ class RabbitHandler(logging.Handler):
         :param record: LogRecord object
         :return:
         """
-        test_id = ZafiraListener().ci_test_id
+        # records logged outside of test thread (e.g. screenshot uploads)
+        # carry ciTestId of their test
+        test_id = getattr(record, 'test_id', None) or \
+            ZafiraListener().ci_test_id
         if test_id:
             correlation_id = '{}_{}'.format(self.routing_key, test_id)
         else:
             correlation_id = ''.join(self.routing_key)
+        if self.async_mode:
+            with metrics.timer('rabbitmq', 'enqueue'):
+                self.__enqueue(record, correlation_id)
+            return
         self.emit_lock.acquire()
         try:
             if not self.connection or not self.channel:
                 self.activate_options()
-            self.channel.basic_publish(exchange=self.exchange,
-                                       routing_key=self.routing_key,
-                                       body=LogstashFormatter().format(record),
-                                       properties=pika.BasicProperties(
-                                           delivery_mode=1,
-                                           correlation_id=correlation_id,
-                                           content_type='application/json'
-                                       ))
+            with metrics.timer('rabbitmq', 'publish'):
+                self.channel.basic_publish(
+                    exchange=self.exchange,
+                    routing_key=self.routing_key,
+                    body=self.logstash_formatter.format(record),
+                    properties=pika.BasicProperties(
+                        delivery_mode=1,
+                        correlation_id=correlation_id,
+                        content_type='application/json'
+                    )
+                )
         except Exception:
             # for the sake of reconnect
             self.channel = None
@@ -107,6 +281,68 @@ class RabbitHandler(logging.Handler):
         finally:
             self.emit_lock.release()
 
+    def flush(self):
+        """
+        Waits until buffered records are published
+        """
+        if self.buffer and self.publisher:
+            timeout = Context.settings().rabbitmq_flush_timeout
+            if not self.buffer.wait_empty(timeout):
+                self.logger.error(
+                    '[mq] Unable to publish buffered logs in {} seconds.'
+                    .format(timeout)
+                )
+            dropped = self.buffer.pop_dropped()
+            if dropped:
+                self.logger.error(
+                    '[mq] {} log records were dropped.'.format(dropped)
+                )
+
+    def __enqueue(self, record, correlation_id):
+        try:
+            body = self.logstash_formatter.format(record)
+            # publisher thread logs into the same logger,
+            # it must never wait for itself
+            wait = threading.current_thread() is not self.publisher
+            self.buffer.put((body, correlation_id), wait)
+        except Exception:
+            self.handleError(record)
+
+    def __publish_loop(self):
+        while True:
+            batch = self.buffer.take(self.batch_size, self.PUBLISH_INTERVAL)
+            published = 0
+            try:
+                if not self.connection or not self.channel:
+                    self.activate_options()
+                if not batch:
+                    # keeps heartbeats of idle connection
+                    if self.connection and self.connection.is_open:
+                        self.connection.process_data_events(0)
+                    continue
+                with metrics.timer('rabbitmq', 'publish_batch'):
+                    for body, correlation_id in batch:
+                        self.channel.basic_publish(
+                            exchange=self.exchange,
+                            routing_key=self.routing_key,
+                            body=body,
+                            properties=pika.BasicProperties(
+                                delivery_mode=1,
+                                correlation_id=correlation_id,
+                                content_type='application/json'
+                            )
+                        )
+                        published += 1
+            except Exception as e:
+                # for the sake of reconnect
+                self.channel = None
+                self.connection = None
+                # not logged above debug: the record would be published
+                # by this thread, failures are reported by flush
+                self.logger.debug('[mq] Unable to publish logs: %s', e)
+            finally:
+                self.buffer.done(len(batch), len(batch) - published)
+
     def __create_connection(self):
         if not self.connection or not self.connection.is_open:
             self.connection = pika.BlockingConnection(
@@ -138,7 +374,7 @@ class RabbitHandler(logging.Handler):
     def __connect_to_zafira(self):
         connected = False
         try:
-            if Context.get(PARAMETER['ZAFIRA_ENABLED']) == 'True':
+            if Context.settings().zafira_enabled:
                 resp = zafira_client.get_setting_tool('RABBITMQ', True)
                 if resp.status_code == 200:
                     settings = resp.json()
@@ -167,6 +403,7 @@ class RabbitHandler(logging.Handler):
         """
         clear when closing
         """
+        self.flush()
         self.acquire()
         moment = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         try:
@@ -189,62 +426,3 @@ class RabbitHandler(logging.Handler):
                     )
         finally:
             self.release()
-
-
-class LogstashFormatter(logging.Formatter):
-    """
-    Custom logging JSON formatter, contains methods to format log record in
-    logstash-compatible format
-    """
-
-    @classmethod
-    def serialize(cls, message):
-        return bytes(json.dumps(message), 'utf-8')
-
-    def format(self, record):
-        """
-        Formats log record into logstash-compatible format
-        :return: JSON representation of log record
-        """
-        message = {}
-        self.write_basic(message, record)
-        if Context.get(PARAMETER['S3_SAVE_SCREENSHOTS']) and\
-                'META_INFO' == record.levelname:
-            self.write_with_headers(message, record)
-
-        json_obj = bytes(json.dumps(message), 'utf-8')
-        return json_obj
-
-    def write_basic(self, message, record):
-        basic_log = {
-            'timestamp': time.time() * 1000,
-            'threadName': normalized_thread_name(record.threadName),
-            'logger': record.name,
-            'message': record.msg,
-            'level': record.levelname
-        }
-        message.update(basic_log)
-
-    def write_with_headers(self, message, record):
-        headers = {
-            'headers': {
-                'AMAZON_PATH': record.amazon_path,
-                'CI_TEST_ID': record.test_id,
-                'AMAZON_PATH_CORRELATION_ID': record.correlation_id
-            }
-        }
-        message.update(headers)
-
-
-def normalized_thread_name(thread_name):
-    """
-    Simplifies a long names of thread (for Zafira UI),
-    e.g. MainThread -> MT, ThreadPoolExecutor -> TPE, etc.
-    :param thread_name: thread name from Log Record object
-    :return: simplified thread name
-    """
-    normalized = ''
-    for symb in thread_name:
-        if symb.isupper():
-            normalized += symb
-    return normalized
@@ -1,6 +1,21 @@
 from .context import Context
 from .environ_parser import get_env_var
 from .driver_provider import DriverProvider
+from .test_case_cache import TestCaseCache
+from .test_state import TestState, TestStateRegistry
+from .upload_executor import (UploadExecutor,
+                              session_upload_executor,
+                              close_session_upload_executor)
 
 
-__all__ = ['Context', 'get_env_var', 'DriverProvider']
+__all__ = [
+    'Context',
+    'get_env_var',
+    'DriverProvider',
+    'TestCaseCache',
+    'TestState',
+    'TestStateRegistry',
+    'UploadExecutor',
+    'session_upload_executor',
+    'close_session_upload_executor'
+]
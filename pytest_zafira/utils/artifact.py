@@ -0,0 +1,91 @@
+import logging
+import os
+import uuid
+from datetime import date
+
+from pytest_zafira import services
+from pytest_zafira.utils.context import Context
+from pytest_zafira import ZafiraListener
+
+
+class Artifact:
+    """
+    Uploads files like videos, HAR files and browser logs to S3 and
+    attaches them to the running test
+    """
+
+    AMAZON_KEY_FORMAT = 'artifacts/{}/{}/'
+    DATE_FORMAT = '%m-%d-%Y'
+
+    logger = logging.getLogger('zafira')
+
+    @classmethod
+    def upload(cls,
+               path_or_stream,
+               name,
+               content_type=None,
+               filename=None,
+               nodeid=None,
+               content_encoding=None):
+        """
+        :param path_or_stream: path to file or binary file object
+        :param name: artifact name shown in Zafira
+        :param content_type: MIME type, guessed from filename if omitted
+        :param filename: name of file in bucket, basename of path
+                         by default
+        :param nodeid: nodeid of test, test running in current thread
+                       by default
+        :param content_encoding: e.g. 'gzip' for compressed content
+        :return: presigned link to artifact
+        """
+        listener = ZafiraListener()
+        if nodeid:
+            test_id = listener.get_ci_test_id(nodeid)
+        else:
+            test_id = listener.ci_test_id
+        url, expires_in = cls.store(path_or_stream,
+                                    name,
+                                    test_id,
+                                    content_type,
+                                    filename,
+                                    content_encoding)
+        listener.attach_artifact(name, url, expires_in, nodeid)
+        return url
+
+    @classmethod
+    def store(cls,
+              path_or_stream,
+              name,
+              test_id=None,
+              content_type=None,
+              filename=None,
+              content_encoding=None):
+        """
+        Uploads artifact to S3 without attaching it to a test
+        :param test_id: ciTestId of test, folder of artifact in bucket
+        :return: presigned link to artifact and its expiration in seconds
+        """
+        if filename is None:
+            filename = os.path.basename(
+                path_or_stream if not hasattr(path_or_stream, 'read')
+                else getattr(path_or_stream, 'name', '') or name
+            )
+        expires_in = Context.settings().artifact_expires_in_default_time
+
+        key = cls.AMAZON_KEY_FORMAT.format(
+            str(date.today().strftime(cls.DATE_FORMAT)),
+            test_id or uuid.uuid4()
+        ) + filename
+        amazon_cloud_service = services.amazon_cloud_service
+        amazon_cloud_service.upload_artifact(
+            path_or_stream,
+            key,
+            content_type,
+            content_encoding=content_encoding
+        )
+
+        url = amazon_cloud_service.generate_amazon_presigned_URL(
+            key,
+            expires_in=expires_in
+        )
+        return url, expires_in
@@ -1,16 +1,44 @@
-import os
 import configparser
 
-CONFIG_FILE_PATH = os.getcwd() + '/zafira_properties.ini'
+from .settings import SECTION, load_settings
+
+_NO_DEFAULT = object()
 
 
 class Context:
-    __CONFIG = None
+    __SETTINGS = None
+
+    @classmethod
+    def configure(cls, config_file=None, ini_options=None, cli_options=None):
+        """
+        Parses configuration once, before plugins read it. See
+        load_settings for parameters
+        :return: Settings
+        """
+        cls.__SETTINGS = load_settings(config_file, ini_options, cli_options)
+        return cls.__SETTINGS
+
+    @classmethod
+    def settings(cls):
+        """
+        :return: Settings, loaded from default sources on first call if
+                 configure was not called
+        """
+        if cls.__SETTINGS is None:
+            cls.__SETTINGS = load_settings()
+        return cls.__SETTINGS
 
     @classmethod
-    def get(cls, parameter):
-        if cls.__CONFIG is None:
-            config = configparser.ConfigParser()
-            config.read(CONFIG_FILE_PATH)
-            cls.__CONFIG = config
-        return cls.__CONFIG.get('config', parameter)
+    def get(cls, parameter, default=_NO_DEFAULT):
+        """
+        :param parameter: name of option in [config] section
+        :param default: value returned when option is missing. If omitted,
+                        missing option raises configparser.NoOptionError
+        :return: raw string value of option
+        """
+        raw = cls.settings().raw
+        if parameter in raw:
+            return raw[parameter]
+        if default is _NO_DEFAULT:
+            raise configparser.NoOptionError(parameter, SECTION)
+        return default
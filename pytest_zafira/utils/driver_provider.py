@@ -1,3 +1,4 @@
+import threading
 from concurrent import futures
 from concurrent.futures import Future
 
@@ -14,14 +15,30 @@ class DriverProvider(BaseDriverProvider):
     Class, provides get-drivers functionality (for customer,
     agent, admin-agent and admin)
     """
+    MAX_WORKERS = 8
+
+    __shared_pool = None
+    __lock = threading.Lock()
+
     def __init__(self, driver_pool):
         self.num_of_drivers = len(driver_pool)
-        self.thread_pool = futures.ThreadPoolExecutor(
-            max_workers=self.num_of_drivers
-        )
+        self.thread_pool = self.get_shared_pool()
 
         self.driver_pool = driver_pool
 
+    @classmethod
+    def get_shared_pool(cls):
+        """
+        :return: thread pool shared by all providers, created on first use
+        """
+        if cls.__shared_pool is None:
+            with cls.__lock:
+                if cls.__shared_pool is None:
+                    cls.__shared_pool = futures.ThreadPoolExecutor(
+                        max_workers=cls.MAX_WORKERS
+                    )
+        return cls.__shared_pool
+
     def get_drivers(self):
         drivers = []
         for driver in self.driver_pool:
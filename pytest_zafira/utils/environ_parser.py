@@ -6,15 +6,21 @@ from pytest_zafira.exceptions import ConfigError
 
 logger = logging.getLogger('zafira')
 
+_NO_DEFAULT = object()
 
-def get_env_var(env_var_key):
+
+def get_env_var(env_var_key, default=_NO_DEFAULT):
     """
     Getter for environment variable keys.  Uses `os.environ.get(KEYNAME)`
     :param env_key:  Type string.  Key name of environment variable to get.
+    :param default:  Value returned when variable is missing.  If omitted,
+                     missing variable raises ConfigError.
     :return:  Value of the environment variable.
     """
     env_var_value = environ.get(env_var_key)
     if env_var_value is None:
+        if default is not _NO_DEFAULT:
+            return default
         logger.error('ENV var missing: [{}], please set this variable'.format(
                 env_var_key
             )
@@ -25,6 +31,6 @@ def get_env_var(env_var_key):
             )
         )
     else:
-        logger.debug('ENV variable is: [{}]:[{}]'.format(env_var_key,
-                                                         env_var_value))
+        # value isn't logged, it may be a secret
+        logger.debug('ENV variable is set: [{}]'.format(env_var_key))
     return env_var_value
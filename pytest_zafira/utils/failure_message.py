@@ -0,0 +1,130 @@
+import array
+import sys
+import zlib
+from collections import deque
+
+try:
+    from _pytest._io import TerminalWriter
+except ImportError:  # pytest < 5.4
+    from py.io import TerminalWriter
+
+# zlib window bits which produce gzip container
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def java_hash_code(text):
+    """
+    :return: hash of text equal to String.hashCode() of Java, the way
+             Zafira computes messageHashCode
+    """
+    units = array.array('H', text.encode('utf-16-le'))
+    if sys.byteorder == 'big':
+        units.byteswap()
+    value = 0
+    for unit in units:
+        value = (31 * value + unit) & 0xFFFFFFFF
+    return value - 0x100000000 if value & 0x80000000 else value
+
+
+class FailureMessage:
+    """
+    Text of a test report, written by pytest terminal writer chunk by
+    chunk. Only head and tail of the text are kept, so deep tracebacks
+    and huge assertion diffs never live in memory as a whole. Complete
+    text is kept gzip compressed if it's needed as an artifact
+    """
+
+    def __init__(self, max_length=0, tail_length=0, keep_full=False):
+        """
+        :param max_length: max number of characters of message, 0 means
+                           unlimited
+        :param tail_length: characters from the end of text kept in
+                            truncated message
+        :param keep_full: compress complete text
+        """
+        self.max_length = max_length
+        self.tail_length = min(tail_length, max_length) if max_length else 0
+        self.head_length = max_length - self.tail_length
+        self.length = 0
+        self.__head = []
+        self.__head_size = 0
+        self.__tail = deque()
+        self.__tail_size = 0
+        self.__compressor = zlib.compressobj(6, zlib.DEFLATED, GZIP_WBITS) \
+            if keep_full else None
+        self.__compressed = []
+
+    @classmethod
+    def render(cls, report, max_length=0, tail_length=0, keep_full=False):
+        """
+        Writes longrepr of report the same way as report.longreprtext
+        :return: FailureMessage
+        """
+        message = cls(max_length, tail_length, keep_full)
+        if report.longrepr is not None:
+            writer = TerminalWriter(file=message)
+            writer.hasmarkup = False
+            report.toterminal(writer)
+        return message
+
+    @property
+    def truncated(self):
+        return bool(self.max_length) and self.length > self.max_length
+
+    def write(self, text):
+        if not text:
+            return
+        if self.__compressor is not None:
+            self.__compressed.append(
+                self.__compressor.compress(text.encode('utf-8'))
+            )
+        self.length += len(text)
+        if not self.max_length or self.__head_size < self.head_length:
+            if self.max_length:
+                head = text[:self.head_length - self.__head_size]
+                text = text[len(head):]
+            else:
+                head, text = text, ''
+            self.__head.append(head)
+            self.__head_size += len(head)
+        if text and self.tail_length:
+            self.__tail.append(text)
+            self.__tail_size += len(text)
+            # drop chunks which are entirely out of the tail
+            while self.__tail_size - len(self.__tail[0]) >= self.tail_length:
+                self.__tail_size -= len(self.__tail.popleft())
+
+    def flush(self):
+        pass
+
+    def text(self, note=None):
+        """
+        :param note: said in place of cut out part of truncated text
+        :return: text of report, stripped like report.longreprtext
+        """
+        head = ''.join(self.__head)
+        tail = ''.join(self.__tail)
+        if not self.truncated:
+            return (head + tail).strip()
+        tail = tail[len(tail) - self.tail_length:]
+        # cut at line breaks, so no line is shown partially
+        if '\n' in head:
+            head = head[:head.rindex('\n') + 1]
+        if '\n' in tail:
+            tail = tail[tail.index('\n') + 1:]
+        skipped = self.length - len(head) - len(tail)
+        return '{}\n\n... {} characters truncated{} ...\n\n{}'.format(
+            head.strip(),
+            skipped,
+            ', ' + note if note else '',
+            tail.rstrip()
+        )
+
+    def compressed(self):
+        """
+        :return: gzip compressed complete text, None if it isn't kept
+        """
+        if self.__compressor is not None:
+            self.__compressed.append(self.__compressor.flush())
+            self.__compressor = None
+        return b''.join(self.__compressed) or None
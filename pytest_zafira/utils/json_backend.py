@@ -0,0 +1,23 @@
+import json
+
+try:
+    import orjson
+
+    JSON_BACKEND = 'orjson'
+
+    def dumps(message):
+        return orjson.dumps(message)
+except ImportError:
+    try:
+        import ujson
+
+        JSON_BACKEND = 'ujson'
+
+        def dumps(message):
+            return ujson.dumps(message).encode('utf-8')
+    except ImportError:
+        JSON_BACKEND = 'json'
+        _encode = json.JSONEncoder().encode
+
+        def dumps(message):
+            return _encode(message).encode('utf-8')
@@ -0,0 +1,118 @@
+import json
+import logging
+import re
+from collections import namedtuple
+
+from pytest_zafira.exceptions import ConfigError
+from pytest_zafira.utils.failure_message import java_hash_code
+
+# parts of failure text which differ between runs of the same failure
+SIGNATURE_RULES = (
+    # note in place of cut out part of long message
+    (re.compile(r'^\.\.\. \d+ characters truncated.*$', re.M), '...'),
+    (re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-'
+                r'[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'), '<uuid>'),
+    # memory addresses, e.g. <Driver object at 0x7f0c2d3e4f50>
+    (re.compile(r'\b0x[0-9a-fA-F]+\b'), '0x?'),
+    # line numbers, e.g. test_login.py:42: AssertionError
+    (re.compile(r'(\.py):\d+'), r'\1:?'),
+    (re.compile(r'\bline \d+'), 'line ?'),
+    # arguments of test function listed above its source, e.g.
+    # parametrize values
+    (re.compile(r'^[A-Za-z_]\w*\s*= .*$', re.M), ''),
+    # parametrize ids, e.g. test_login[admin-3]
+    (re.compile(r'(\btest\w*)\[[^\]\n]*\]'), r'\1[?]'),
+    # header of reports of xdist workers
+    (re.compile(r'^\[gw\d+\] .*$', re.M), ''),
+    (re.compile(r'[ \t]+$', re.M), ''),
+    (re.compile(r'\n{3,}'), '\n\n'),
+)
+
+KnownIssue = namedtuple('KnownIssue', ('signature', 'work_item', 'blocker'))
+
+
+def normalize_failure(text):
+    """
+    :return: failure text without run-specific details like addresses,
+             line numbers and parametrize ids
+    """
+    for pattern, replacement in SIGNATURE_RULES:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def failure_signature(text):
+    """
+    :return: Java-style hash code of normalized failure text, the same for
+             all occurrences of a failure
+    """
+    return java_hash_code(normalize_failure(text or ''))
+
+
+class KnownIssueIndex:
+    """
+    Known issues by failure signature, loaded once per run from JSON file
+    and/or Zafira, so every failure is matched by a single dict lookup.
+    Issue is a JSON object with work item, e.g. 'JIRA-1234', and either
+    signature (messageHashCode of failed test) or message of failed test:
+
+        [{"workItem": "JIRA-1234", "signature": -1254734092},
+         {"workItem": "JIRA-42", "message": "...", "blocker": true}]
+    """
+
+    logger = logging.getLogger('zafira')
+
+    def __init__(self):
+        self.__issues = {}
+
+    def __len__(self):
+        return len(self.__issues)
+
+    def add(self, issue):
+        """
+        :param issue: dict of JSON issue
+        """
+        try:
+            if issue.get('signature') is not None:
+                signature = int(issue['signature'])
+            else:
+                signature = failure_signature(issue['message'])
+            self.__issues[signature] = KnownIssue(
+                signature,
+                str(issue['workItem']),
+                bool(issue.get('blocker'))
+            )
+        except (KeyError, TypeError, ValueError, AttributeError):
+            self.logger.warning(
+                "Known issue is skipped, it needs workItem and signature "
+                "or message: {}".format(issue)
+            )
+
+    def add_all(self, issues):
+        """
+        :param issues: list of JSON issues
+        """
+        if not isinstance(issues, list):
+            raise ValueError("known issues must be a JSON list")
+        for issue in issues:
+            self.add(issue)
+        return self
+
+    def load_file(self, path):
+        """
+        Adds issues listed in JSON file
+        """
+        try:
+            with open(path) as f:
+                issues = json.load(f)
+        except (IOError, ValueError) as e:
+            raise ConfigError(
+                "Unable to read known issues from {}: {}".format(path, e)
+            )
+        return self.add_all(issues)
+
+    def match(self, signature):
+        """
+        :return: KnownIssue with the signature or None
+        """
+        return self.__issues.get(signature)
@@ -0,0 +1,35 @@
+import importlib
+import sys
+
+
+def lazy_exports(package, exports):
+    """
+    Builds module __getattr__ which imports exported names on first
+    access, so heavy dependencies (boto3, pika, requests, aiohttp) are
+    loaded only by features which use them
+    :param package: __name__ of package
+    :param exports: (name, module, attribute) triples, module is relative
+                    to package
+    :return: __getattr__ function for package namespace
+    """
+    sources = {name: (module, attribute)
+               for name, module, attribute in exports}
+
+    def __getattr__(name):
+        try:
+            module, attribute = sources[name]
+        except KeyError:
+            raise AttributeError(
+                "module {!r} has no attribute {!r}".format(package, name)
+            )
+        value = getattr(importlib.import_module(module, package), attribute)
+        # next lookups don't get here
+        setattr(sys.modules[package], name, value)
+        return value
+
+    if sys.version_info < (3, 7):
+        # module __getattr__ is not supported, so names are imported now,
+        # in the given order
+        for name, _, _ in exports:
+            __getattr__(name)
+    return __getattr__
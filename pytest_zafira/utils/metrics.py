@@ -0,0 +1,127 @@
+import contextlib
+import json
+import math
+import os
+import re
+import threading
+import time
+
+ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+def endpoint_name(method, endpoint):
+    """
+    :return: metric name of HTTP call with ids in path replaced, e.g.
+             'POST /api/tests/{id}/finish'
+    """
+    return '{} {}'.format(method, ID_SEGMENT.sub('/{id}',
+                                                 endpoint.split('?', 1)[0]))
+
+
+def percentile(ordered, percent):
+    """
+    :param ordered: sorted samples
+    :return: nearest-rank percentile
+    """
+    rank = int(math.ceil(percent / 100.0 * len(ordered)))
+    return ordered[max(rank - 1, 0)]
+
+
+class Metrics:
+    """
+    Durations of reporting work (Zafira calls, plugin hooks, S3 uploads,
+    RabbitMQ publishes) grouped by category and name. Nothing is
+    recorded until enabled
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.__samples = {}
+        self.__lock = threading.Lock()
+
+    def record(self, category, name, seconds):
+        if not self.enabled:
+            return
+        with self.__lock:
+            self.__samples.setdefault((category, name), []).append(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, category, name):
+        """
+        Records duration of with block
+        """
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(category, name, time.perf_counter() - started)
+
+    def reset(self):
+        with self.__lock:
+            self.__samples = {}
+
+    def summary(self, session_seconds=None):
+        """
+        :param session_seconds: wall time of session, to compute share of
+                                it spent by every metric
+        :return: list of dicts with count, total and percentiles in
+                 seconds, sorted by category and total time
+        """
+        with self.__lock:
+            samples = {key: sorted(values)
+                       for key, values in self.__samples.items()}
+        rows = []
+        for (category, name), ordered in samples.items():
+            total = sum(ordered)
+            rows.append({
+                'category': category,
+                'name': name,
+                'count': len(ordered),
+                'total': total,
+                'share': total / session_seconds
+                if session_seconds else None,
+                'p50': percentile(ordered, 50),
+                'p95': percentile(ordered, 95),
+                'p99': percentile(ordered, 99),
+                'max': ordered[-1]
+            })
+        rows.sort(key=lambda row: (row['category'], -row['total']))
+        return rows
+
+    def format_summary(self, session_seconds=None):
+        """
+        :return: lines of text table of summary, times in milliseconds
+        """
+        lines = ['{:<8} {:<44} {:>7} {:>9} {:>6} {:>8} {:>8} {:>8} '
+                 '{:>8}'.format('category', 'name', 'count', 'total s',
+                                'share', 'p50 ms', 'p95 ms', 'p99 ms',
+                                'max ms')]
+        for row in self.summary(session_seconds):
+            share = '{:.1%}'.format(row['share']) \
+                if row['share'] is not None else '-'
+            lines.append(
+                '{:<8} {:<44} {:>7} {:>9.3f} {:>6} {:>8.1f} {:>8.1f} '
+                '{:>8.1f} {:>8.1f}'.format(
+                    row['category'], row['name'][:44], row['count'],
+                    row['total'], share, row['p50'] * 1000,
+                    row['p95'] * 1000, row['p99'] * 1000,
+                    row['max'] * 1000
+                )
+            )
+        return lines
+
+    def write_json(self, path, session_seconds=None):
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'timestamp': time.time(),
+                       'session_seconds': session_seconds,
+                       'metrics': self.summary(session_seconds)},
+                      f, indent=2)
+
+
+metrics = Metrics()
@@ -1,12 +1,14 @@
+import base64
 import random
+import threading
 import uuid
 from datetime import date
 import logging
 import string
 
-from pytest_zafira.services import amazon_cloud_service
+from pytest_zafira import services
 from pytest_zafira.utils.context import Context
-from pytest_zafira.constants import PARAMETER
+from pytest_zafira.utils.screenshot_processor import ScreenshotProcessor
 from pytest_zafira import ZafiraListener
 
 
@@ -17,47 +19,116 @@ class Screenshot:
 
     logger = logging.getLogger('zafira')
 
+    __processor = None
+    __lock = threading.Lock()
+
+    @classmethod
+    def upload_to_amazon_S3(cls, file, test_id=None):
+        """
+        Kept for backward compatibility, upload_png_to_amazon_S3
+        doesn't need base64 round trips
+        :param file: base64 encoded image
+        :param test_id: ciTestId of test the screenshot belongs to,
+                        test running in current thread by default
+        """
+        cls.upload_png_to_amazon_S3(base64.b64decode(file), test_id)
+
     @classmethod
-    def upload_to_amazon_S3(cls, file):
-        if not Context.get(PARAMETER['S3_SAVE_SCREENSHOTS']):
+    def upload_png_to_amazon_S3(cls, png, test_id=None):
+        """
+        :param png: raw PNG image as bytes or memoryview
+        :param test_id: ciTestId of test the screenshot belongs to,
+                        test running in current thread by default
+        """
+        if not Context.settings().s3_save_screenshots:
             cls.logger.debug(
                 "there is no sense to continue as saving"
                 " screenshots onto S3 is disabled."
             )
             return
 
+        processor = cls.get_processor()
         correlation_id = str(uuid.uuid4())
-        test_id = ZafiraListener().ci_test_id
-        expires_in = Context.get(
-            PARAMETER['ARTIFACT_EXPIRES_IN_DEFAULT_TIME']
-        )
-
-        filename = ''.join(
-            random.sample((string.ascii_lowercase + string.digits), 10)
-        ) + '.png'
-
-        key = cls.AMAZON_KEY_FORMAT.format(
-            str(date.today().strftime(cls.DATE_FORMAT))
-        ) + filename
-
-        cls.logger.info("TEST FAILED!")
-        cls.logger.setLevel('META_INFO')
-        cls.logger.meta_info(
-            "Uploading to AWS: {}. Expires in {} seconds.".format(filename,
-                                                                  expires_in),
-            extra={'amazon_path': None,
-                   'test_id': test_id,
-                   'correlation_id': correlation_id}
-        )
-        amazon_cloud_service.upload_image_from_base64(file, key)
+        test_id = test_id or ZafiraListener().ci_test_id
+        expires_in = Context.settings().artifact_expires_in_default_time
+
+        digest = processor.digest(png)
+        url = processor.claim(digest)
+        if url:
+            cls.logger.setLevel('META_INFO')
+            cls.__log_uploaded("Screenshot is already uploaded to AWS",
+                               url, test_id, correlation_id)
+            return
+
+        reserved = 0
+        try:
+            image = processor.process(png)
+            if not processor.reserve(len(image.data)):
+                cls.logger.warning(
+                    "Screenshot is not uploaded: screenshots of the run"
+                    " exceed {} bytes".format(processor.max_total_bytes)
+                )
+                processor.release(digest)
+                return
+            reserved = len(image.data)
+
+            filename = ''.join(
+                random.sample((string.ascii_lowercase + string.digits), 10)
+            ) + image.extension
 
-        url = amazon_cloud_service.generate_amazon_presigned_URL(
-            key,
-            expires_in=expires_in
-        )
+            key = cls.AMAZON_KEY_FORMAT.format(
+                str(date.today().strftime(cls.DATE_FORMAT))
+            ) + filename
 
+            cls.logger.info("TEST FAILED!")
+            cls.logger.setLevel('META_INFO')
+            cls.logger.meta_info(
+                "Uploading to AWS: {}. Expires in {} seconds.".format(
+                    filename, expires_in
+                ),
+                extra={'amazon_path': None,
+                       'test_id': test_id,
+                       'correlation_id': correlation_id}
+            )
+            amazon_cloud_service = services.amazon_cloud_service
+            amazon_cloud_service.upload_image(image.data,
+                                              key,
+                                              content_type=image.content_type)
+
+            url = amazon_cloud_service.generate_amazon_presigned_URL(
+                key,
+                expires_in=expires_in
+            )
+        except Exception:
+            processor.release(digest, reserved)
+            raise
+        processor.remember_uploaded(digest, url)
+
+        cls.__log_uploaded("Uploaded to AWS: " + filename,
+                           url, test_id, correlation_id)
+
+    @classmethod
+    def get_processor(cls):
+        """
+        :return: ScreenshotProcessor configured for the run
+        """
+        if cls.__processor is None:
+            with cls.__lock:
+                if cls.__processor is None:
+                    settings = Context.settings()
+                    cls.__processor = ScreenshotProcessor(
+                        settings.screenshot_format,
+                        settings.screenshot_max_width,
+                        settings.screenshot_quality,
+                        settings.screenshot_dedup,
+                        settings.screenshot_max_total_bytes
+                    )
+        return cls.__processor
+
+    @classmethod
+    def __log_uploaded(cls, message, url, test_id, correlation_id):
         logging.getLogger('zafira').meta_info(
-            "Uploaded to AWS: " + filename,
+            message,
             extra={'amazon_path': url,
                    'test_id': test_id,
                    'correlation_id': correlation_id})
@@ -0,0 +1,147 @@
+import hashlib
+import io
+import logging
+import threading
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+class ProcessedImage:
+    __slots__ = ('data', 'content_type', 'extension')
+
+    def __init__(self, data, content_type, extension):
+        self.data = data
+        self.content_type = content_type
+        self.extension = extension
+
+
+class ScreenshotProcessor:
+    """
+    Prepares screenshots for upload: downscales and re-encodes them
+    (requires Pillow), finds screenshots which were already uploaded during
+    the run and keeps total size of uploaded screenshots within a budget.
+    Identical screenshots taken at the same time are uploaded once: the
+    first thread claims the digest, the others wait for its link
+    """
+    FORMATS = {
+        'png': ('PNG', 'image/png', '.png'),
+        'jpeg': ('JPEG', 'image/jpeg', '.jpg'),
+        'webp': ('WEBP', 'image/webp', '.webp')
+    }
+
+    logger = logging.getLogger('zafira')
+
+    def __init__(self,
+                 image_format='png',
+                 max_width=0,
+                 quality=80,
+                 dedup=True,
+                 max_total_bytes=0):
+        """
+        :param image_format: png, jpeg or webp
+        :param max_width: wider screenshots are downscaled, 0 keeps size
+        :param quality: jpeg/webp quality, 1-100
+        :param dedup: reuse link to identical screenshot uploaded before
+        :param max_total_bytes: upload budget per run, 0 means unlimited
+        """
+        if image_format not in self.FORMATS:
+            raise ValueError('Unsupported screenshot format: {}'.format(
+                image_format
+            ))
+        self.image_format = image_format
+        self.max_width = max_width
+        self.quality = quality
+        self.dedup = dedup
+        self.max_total_bytes = max_total_bytes
+        self.uploaded_bytes = 0
+        self.__urls = {}
+        # events of digests being uploaded
+        self.__claims = {}
+        self.__lock = threading.Lock()
+        if Image is None and (image_format != 'png' or max_width):
+            self.logger.warning(
+                'Pillow is not installed, screenshots are uploaded as is'
+            )
+
+    @staticmethod
+    def digest(png):
+        return hashlib.sha1(png).hexdigest()
+
+    def claim(self, digest):
+        """
+        Finds identical screenshot, waits for it if it's being uploaded
+        :return: link to identical screenshot, or None if the caller has
+                 claimed the digest and must upload the screenshot, then
+                 call remember_uploaded or release
+        """
+        if not self.dedup:
+            return None
+        while True:
+            with self.__lock:
+                url = self.__urls.get(digest)
+                if url:
+                    return url
+                claim = self.__claims.get(digest)
+                if claim is None:
+                    self.__claims[digest] = threading.Event()
+                    return None
+            claim.wait()
+
+    def remember_uploaded(self, digest, url):
+        if self.dedup:
+            with self.__lock:
+                self.__urls[digest] = url
+                self.__release_claim(digest)
+
+    def release(self, digest, size=0):
+        """
+        Gives back claim of digest and reserved bytes of failed upload,
+        so identical screenshot can be uploaded again
+        """
+        with self.__lock:
+            self.uploaded_bytes -= size
+            self.__release_claim(digest)
+
+    def __release_claim(self, digest):
+        claim = self.__claims.pop(digest, None)
+        if claim is not None:
+            claim.set()
+
+    def reserve(self, size):
+        """
+        Takes size bytes of the upload budget
+        :return: False if budget is exhausted
+        """
+        with self.__lock:
+            if self.max_total_bytes and \
+                    self.uploaded_bytes + size > self.max_total_bytes:
+                return False
+            self.uploaded_bytes += size
+            return True
+
+    def process(self, png):
+        """
+        :param png: raw PNG image
+        :return: ProcessedImage
+        """
+        pil_format, content_type, extension = self.FORMATS[self.image_format]
+        if Image is None or (self.image_format == 'png' and
+                             not self.max_width):
+            return ProcessedImage(png, 'image/png', '.png')
+
+        image = Image.open(io.BytesIO(png))
+        if self.max_width and image.width > self.max_width:
+            height = round(image.height * self.max_width / image.width)
+            image = image.resize((self.max_width, height), Image.LANCZOS)
+        if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        output = io.BytesIO()
+        if pil_format == 'PNG':
+            image.save(output, pil_format, optimize=True)
+        else:
+            image.save(output, pil_format, quality=self.quality)
+        return ProcessedImage(output.getvalue(), content_type, extension)
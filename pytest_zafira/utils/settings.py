@@ -0,0 +1,164 @@
+import configparser
+import os
+from collections import namedtuple
+from types import MappingProxyType
+
+from pytest_zafira.constants import PARAMETER
+from pytest_zafira.exceptions import ConfigError
+
+from .environ_parser import get_env_var
+
+CONFIG_FILE_NAME = 'zafira_properties.ini'
+CONFIG_FILE_ENV_VAR = 'ZAFIRA_CONFIG_FILE'
+SECTION = 'config'
+
+
+def to_bool(value):
+    return value.strip().lower() in ('true', '1', 'yes', 'on')
+
+
+# PARAMETER key, type, default
+OPTIONS = (
+    ('BASE_URL', str, None),
+    ('SERVICE_URL', str, None),
+    ('ACCESS_TOKEN', str, None),
+    ('ZAFIRA_APP_URL', str, None),
+    ('ZAFIRA_ENABLED', to_bool, False),
+    ('JOB_NAME', str, None),
+    ('SUITE_NAME', str, None),
+    ('ARTIFACT_EXPIRES_IN_DEFAULT_TIME', int, 86400),
+    ('ARTIFACT_LOG_NAME', str, 'Log'),
+    ('AWS_ACCESS_KEY', str, None),
+    ('AWS_SECRET_KEY', str, None),
+    ('AWS_SCREEN_SHOT_BUCKET', str, None),
+    ('S3_SAVE_SCREENSHOTS', to_bool, False),
+    ('AWS_MAX_POOL_CONNECTIONS', int, 10),
+    ('SCREENSHOT_UPLOAD_WORKERS', int, 4),
+    ('SCREENSHOT_UPLOAD_QUEUE_SIZE', int, 32),
+    ('SCREENSHOT_UPLOAD_TIMEOUT', float, 60),
+    ('ARTIFACT_MULTIPART_THRESHOLD', int, 8 * 1024 * 1024),
+    ('ARTIFACT_MULTIPART_CHUNKSIZE', int, 8 * 1024 * 1024),
+    ('ARTIFACT_UPLOAD_CONCURRENCY', int, 4),
+    ('SCREENSHOT_FORMAT', str, 'png'),
+    ('SCREENSHOT_MAX_WIDTH', int, 0),
+    ('SCREENSHOT_QUALITY', int, 80),
+    ('SCREENSHOT_DEDUP', to_bool, True),
+    ('SCREENSHOT_MAX_TOTAL_BYTES', int, 0),
+    ('REPORTING_MODE', str, 'sync'),
+    ('REPORTING_DRAIN_TIMEOUT', float, 60),
+    ('SPOOL_FILE', str, '.zafira_spool/journal.jsonl'),
+    ('SPOOL_FSYNC', str, 'interval'),
+    ('SPOOL_FSYNC_INTERVAL', float, 1),
+    ('SPOOL_ON_UNAVAILABLE', to_bool, False),
+    ('HTTP_POOL_SIZE', int, 10),
+    ('HTTP_CONNECT_TIMEOUT', float, 10),
+    ('HTTP_READ_TIMEOUT', float, 60),
+    ('HTTP_GZIP_REQUESTS', to_bool, False),
+    ('HTTP_CLIENT', str, 'requests'),
+    ('HTTP_RETRIES', int, 3),
+    ('HTTP_RETRY_BACKOFF', float, 0.5),
+    ('HTTP_RETRY_MAX_BACKOFF', float, 10),
+    ('CIRCUIT_BREAKER_THRESHOLD', int, 5),
+    ('CIRCUIT_BREAKER_RESET_TIMEOUT', float, 30),
+    ('TOKEN_CACHE', to_bool, True),
+    ('TOKEN_CACHE_FILE', str, '.zafira_cache/token.json'),
+    ('TOKEN_REFRESH_MARGIN', float, 60),
+    ('FAILURE_MESSAGE_MAX_LENGTH', int, 16384),
+    ('FAILURE_MESSAGE_TAIL_LENGTH', int, 4096),
+    ('FAILURE_TRACE_UPLOAD', to_bool, False),
+    ('KNOWN_ISSUES_FILE', str, None),
+    ('KNOWN_ISSUES_ENDPOINT', str, None),
+    ('METRICS', to_bool, False),
+    ('METRICS_FILE', str, None),
+    ('TEST_CASE_CACHE', to_bool, False),
+    ('TEST_CASE_CACHE_FILE', str, '.zafira_cache/test_cases.json'),
+    ('TEST_CASE_CACHE_SIZE', int, 10000),
+    ('TEST_CASE_PREREGISTRATION', to_bool, True),
+    ('TEST_CASE_BATCH_SIZE', int, 100),
+    ('TEST_CASE_REGISTRATION_CONCURRENCY', int, 8),
+    ('RABBITMQ_ASYNC', to_bool, False),
+    ('RABBITMQ_BUFFER_SIZE', int, 10000),
+    ('RABBITMQ_BATCH_SIZE', int, 100),
+    ('RABBITMQ_OVERFLOW_POLICY', str, 'drop_oldest'),
+    ('RABBITMQ_SPILL_FILE', str, '.zafira_cache/rabbitmq_spill.jsonl'),
+    ('RABBITMQ_FLUSH_TIMEOUT', float, 30),
+)
+
+
+class Settings(namedtuple('Settings',
+                          [key.lower() for key, _, _ in OPTIONS] +
+                          ['raw', 'config_file'])):
+    """
+    Typed options parsed once per session. Options are plain attributes
+    named after PARAMETER keys in lower case, e.g. settings.service_url;
+    raw holds string values of all options by their names in ini file
+    """
+    __slots__ = ()
+
+
+def env_var_name(option):
+    """
+    :return: name of env var overriding option, e.g. ZAFIRA_SERVICE_URL
+             for service-url and ZAFIRA_ENABLED for zafira_enabled
+    """
+    name = option.upper().replace('-', '_')
+    return name if name.startswith('ZAFIRA_') else 'ZAFIRA_' + name
+
+
+def parse_options(lines):
+    """
+    :param lines: 'option=value' strings from pytest ini or command line
+    :return: dict of options
+    """
+    options = {}
+    for line in lines or ():
+        if '=' not in line:
+            raise ConfigError(
+                'Zafira option must look like name=value: ' + line
+            )
+        name, value = line.split('=', 1)
+        options[name.strip()] = value.strip()
+    return options
+
+
+def load_settings(config_file=None, ini_options=None, cli_options=None):
+    """
+    Merges options, every next source overrides the previous ones:
+    zafira_properties.ini, zafira_options of pytest ini file, ZAFIRA_*
+    env vars, --zafira-option of pytest command line
+    :param config_file: path to properties file, $ZAFIRA_CONFIG_FILE or
+                        zafira_properties.ini in working directory
+                        by default
+    :param ini_options: dict of options from pytest ini file
+    :param cli_options: dict of options from pytest command line
+    :return: Settings
+    """
+    config_file = config_file or \
+        get_env_var(CONFIG_FILE_ENV_VAR, None) or \
+        os.path.join(os.getcwd(), CONFIG_FILE_NAME)
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    raw = dict(config.items(SECTION)) if config.has_section(SECTION) else {}
+    raw.update(ini_options or {})
+    for key, _, _ in OPTIONS:
+        option = PARAMETER[key]
+        value = get_env_var(env_var_name(option), None)
+        if value is not None:
+            raw[option] = value
+    raw.update(cli_options or {})
+
+    values = []
+    for key, convert, default in OPTIONS:
+        value = raw.get(PARAMETER[key])
+        if value is None or value == '':
+            values.append(default)
+            continue
+        try:
+            values.append(convert(value))
+        except ValueError:
+            raise ConfigError('Invalid value of Zafira option {}: {}'.format(
+                PARAMETER[key], value
+            ))
+    return Settings(*values,
+                    raw=MappingProxyType(raw),
+                    config_file=config_file)
@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+
+class TestCaseCache:
+    """
+    Keeps ids of test cases registered in Zafira between runs, so a test
+    case which is already known doesn't need to be POSTed again.
+    Ids are stored in a JSON file, grouped by service url and test suite.
+    Entries of the active suite are kept in memory in LRU order
+    """
+    VERSION = 1
+
+    logger = logging.getLogger('zafira')
+
+    def __init__(self, path, service_url, max_size=10000):
+        """
+        :param path: path to cache file
+        :param service_url: Zafira service url, ids are valid for it only
+        :param max_size: max number of cached test cases per suite
+        """
+        self.path = path
+        self.service_url = service_url
+        self.max_size = max_size
+        self.__lock = threading.Lock()
+        self.__namespaces = {}
+        self.__namespace = None
+        self.__entries = OrderedDict()
+        self.__changed = False
+
+    def load(self):
+        """
+        Reads cache file. Missing, broken or outdated file is
+        treated as an empty cache
+        """
+        try:
+            with open(self.path) as f:
+                content = json.load(f)
+            if content.get('version') == self.VERSION:
+                self.__namespaces = content.get('namespaces', {})
+        except (IOError, OSError, ValueError) as e:
+            self.logger.debug("Test case cache is not loaded: %s", e)
+        return self
+
+    def bind(self, test_suite_id):
+        """
+        Selects test suite which test cases are looked up
+        :param test_suite_id: id of test suite in Zafira
+        """
+        with self.__lock:
+            self.__store()
+            self.__namespace = '{}#{}'.format(self.service_url, test_suite_id)
+            self.__entries = OrderedDict(
+                (self.__key(test_class, test_method), test_case_id)
+                for test_class, test_method, test_case_id
+                in self.__namespaces.get(self.__namespace, [])
+            )
+
+    def is_cold(self):
+        return not self.__entries
+
+    def get(self, test_class, test_method):
+        """
+        :return: id of test case or None if it's not cached
+        """
+        key = self.__key(test_class, test_method)
+        with self.__lock:
+            test_case_id = self.__entries.get(key)
+            if test_case_id is not None:
+                self.__entries.move_to_end(key)
+            return test_case_id
+
+    def put(self, test_class, test_method, test_case_id):
+        key = self.__key(test_class, test_method)
+        with self.__lock:
+            if self.__entries.get(key) == test_case_id:
+                self.__entries.move_to_end(key)
+                return
+            self.__entries[key] = test_case_id
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+            self.__changed = True
+
+    def invalidate(self, test_class, test_method):
+        with self.__lock:
+            if self.__entries.pop(self.__key(test_class, test_method), None):
+                self.__changed = True
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__namespaces = {}
+            self.__changed = True
+
+    def save(self):
+        """
+        Writes cache file if anything was changed
+        """
+        with self.__lock:
+            self.__store()
+            if not self.__changed:
+                return
+            content = {'version': self.VERSION,
+                       'namespaces': self.__namespaces}
+            try:
+                directory = os.path.dirname(self.path)
+                if directory and not os.path.isdir(directory):
+                    os.makedirs(directory)
+                tmp_path = self.path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump(content, f)
+                os.replace(tmp_path, self.path)
+                self.__changed = False
+            except (IOError, OSError) as e:
+                self.logger.error("Unable to save test case cache: %s", e)
+
+    def __store(self):
+        if self.__namespace is None:
+            return
+        self.__namespaces[self.__namespace] = [
+            key.split('::', 1) + [test_case_id]
+            for key, test_case_id in self.__entries.items()
+        ]
+
+    @staticmethod
+    def __key(test_class, test_method):
+        return '{}::{}'.format(test_class, test_method)
@@ -0,0 +1,102 @@
+import threading
+
+try:
+    from contextvars import ContextVar
+except ImportError:  # python < 3.7
+    ContextVar = None
+
+
+class TestState:
+    """
+    Zafira data of a single running test
+    """
+    __slots__ = ('nodeid', 'ci_test_id', 'test_case', 'test', 'skip_reason',
+                 'artifacts', 'work_items', 'log_link', 'finished')
+
+    def __init__(self, nodeid):
+        self.nodeid = nodeid
+        self.ci_test_id = None
+        self.test_case = None
+        self.test = None
+        self.skip_reason = None
+        # (name, link, expires in) of artifacts and work items reported
+        # with finished test
+        self.artifacts = []
+        self.work_items = []
+        self.log_link = False
+        # artifacts attached later are reported separately
+        self.finished = False
+
+
+class _ThreadLocalVar:
+    """
+    Minimal ContextVar replacement for pythons without contextvars
+    """
+
+    def __init__(self, name, default=None):
+        self.name = name
+        self.default = default
+        self.__local = threading.local()
+
+    def get(self):
+        return getattr(self.__local, 'value', self.default)
+
+    def set(self, value):
+        self.__local.value = value
+
+
+class TestStateRegistry:
+    """
+    Keeps state of running tests by nodeid, so tests running concurrently
+    in threads don't overwrite each other's data. State of the test which
+    runs in the current thread (or asyncio task) is tracked by context
+    variable, e.g. for log records and screenshots
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__states = {}
+        if ContextVar is not None:
+            self.__current = ContextVar('zafira_test_state', default=None)
+        else:
+            self.__current = _ThreadLocalVar('zafira_test_state')
+
+    def start(self, nodeid, current=True):
+        """
+        Registers new state for a test
+        :param nodeid: pytest nodeid of test
+        :param current: mark state as state of test running in
+                        current context
+        :return: TestState
+        """
+        state = TestState(nodeid)
+        with self.__lock:
+            self.__states[nodeid] = state
+        if current:
+            self.__current.set(state)
+        return state
+
+    def get(self, nodeid):
+        """
+        :return: TestState or None if test is not started
+        """
+        with self.__lock:
+            return self.__states.get(nodeid)
+
+    def get_or_start(self, nodeid, current=True):
+        return self.get(nodeid) or self.start(nodeid, current)
+
+    def current(self):
+        """
+        :return: TestState of test running in current context or None.
+        State stays current after test is finished until the next test
+        starts, so logs of fixture teardown are still bound to the test
+        """
+        return self.__current.get()
+
+    def finish(self, nodeid):
+        """
+        Forgets state of finished test
+        """
+        with self.__lock:
+            return self.__states.pop(nodeid, None)
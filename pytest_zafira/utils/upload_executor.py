@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from concurrent import futures
+
+from .context import Context
+
+
+class UploadExecutor:
+    """
+    Long-lived thread pool for uploads shared by the whole session.
+    Number of queued and running uploads is bounded: when the limit is
+    reached, submit waits for a free slot up to upload timeout and then
+    drops the upload, so a slow storage never stalls tests for long
+    """
+
+    logger = logging.getLogger('zafira')
+
+    def __init__(self, max_workers=4, max_pending=32, timeout=60):
+        """
+        :param max_workers: number of uploading threads
+        :param max_pending: max number of queued and running uploads
+        :param timeout: seconds to wait for a free slot and for all
+                        pending uploads on drain
+        """
+        self.timeout = timeout
+        self.__pool = futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.__slots = threading.BoundedSemaphore(max_pending)
+        self.__lock = threading.Lock()
+        self.__pending = set()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Schedules upload
+        :return: Future or None if upload was dropped
+        """
+        if not self.__slots.acquire(timeout=self.timeout):
+            self.logger.error(
+                'Upload queue is full for {} seconds, upload is dropped'
+                .format(self.timeout)
+            )
+            return None
+        try:
+            future = self.__pool.submit(func, *args, **kwargs)
+        except RuntimeError:
+            self.__slots.release()
+            raise
+        with self.__lock:
+            self.__pending.add(future)
+        future.add_done_callback(self.__on_done)
+        return future
+
+    def drain(self, timeout=None):
+        """
+        Waits for scheduled uploads
+        :param timeout: total seconds to wait, upload timeout by default.
+                        Uploads run in parallel, so the deadline doesn't
+                        grow with the number of pending uploads
+        :return: True if all uploads are finished
+        """
+        with self.__lock:
+            pending = list(self.__pending)
+        if not pending:
+            return True
+        if timeout is None:
+            timeout = self.timeout
+        started = time.time()
+        done, not_done = futures.wait(pending, timeout)
+        if not_done:
+            self.logger.error(
+                '{} uploads are not finished in {:.1f} seconds'.format(
+                    len(not_done), time.time() - started
+                )
+            )
+        return not not_done
+
+    def shutdown(self, wait=True):
+        self.__pool.shutdown(wait=wait)
+
+    def __on_done(self, future):
+        with self.__lock:
+            self.__pending.discard(future)
+        self.__slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            self.logger.error('Upload failed: %s', future.exception())
+
+
+_session_executor = None
+_session_lock = threading.Lock()
+
+
+def session_upload_executor():
+    """
+    :return: UploadExecutor shared by all uploads of the session, e.g.
+             screenshots and failure traces
+    """
+    global _session_executor
+    with _session_lock:
+        if _session_executor is None:
+            settings = Context.settings()
+            _session_executor = UploadExecutor(
+                settings.screenshot_upload_workers,
+                settings.screenshot_upload_queue_size,
+                settings.screenshot_upload_timeout
+            )
+        return _session_executor
+
+
+def close_session_upload_executor():
+    """
+    Waits for uploads of the session and stops uploading threads
+    :return: True if all uploads are finished
+    """
+    global _session_executor
+    with _session_lock:
+        executor, _session_executor = _session_executor, None
+    if executor is None:
+        return True
+    finished = executor.drain()
+    executor.shutdown(wait=False)
+    return finished
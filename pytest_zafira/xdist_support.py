@@ -0,0 +1,72 @@
+import time
+import uuid
+
+import pytest
+
+CI_TEST_ID_PROPERTY = 'zafira_ci_test_id'
+START_TIME_PROPERTY = 'zafira_start_time'
+XFAIL_PROPERTY = 'zafira_xfail'
+ARTIFACT_PROPERTY = 'zafira_artifact'
+WORKER_INPUT_KEY = 'zafira'
+
+
+def is_xdist_worker(config):
+    return hasattr(config, 'workerinput')
+
+
+def is_xdist_controller(config):
+    return config.pluginmanager.has_plugin('dsession')
+
+
+class ZafiraXdistWorker:
+    """
+    Hooks for pytest-xdist worker. Worker never talks to Zafira: the test
+    run is registered by controller, and data controller can't learn from
+    test reports is attached to them as user properties
+    """
+
+    def __init__(self, listener, workerinput):
+        """
+        :param listener: PyTestZafiraPlugin instance of the worker
+        :param workerinput: data sent by controller on node setup
+        """
+        self.listener = listener
+        zafira_input = workerinput.get(WORKER_INPUT_KEY) or {}
+        self.enabled = zafira_input.get('enabled', False)
+        if self.enabled:
+            from .api import zafira_client
+            listener.test_run = zafira_input['test_run']
+            listener.zc = zafira_client
+            listener.zc.access_token = zafira_input['access_token']
+
+    @pytest.hookimpl
+    def pytest_runtest_setup(self, item):
+        if not self.enabled:
+            return
+        state = self.listener.test_states.start(item.nodeid)
+        state.ci_test_id = str(uuid.uuid4())
+        xfail = hasattr(getattr(item, '_evalxfail', None), 'reason')
+        item.user_properties.extend([
+            (CI_TEST_ID_PROPERTY, state.ci_test_id),
+            (START_TIME_PROPERTY, round(time.time() * 1000)),
+            (XFAIL_PROPERTY, xfail)
+        ])
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        outcome = yield
+        state = self.listener.test_states.get(item.nodeid)
+        if not self.enabled or state is None or not state.artifacts:
+            return
+        report = outcome.get_result()
+        # report shares user_properties list with item, so artifacts
+        # are added to a copy to be sent with this report only
+        report.user_properties = list(report.user_properties) + [
+            (ARTIFACT_PROPERTY, artifact) for artifact in state.artifacts
+        ]
+        del state.artifacts[:]
+
+    @pytest.hookimpl
+    def pytest_runtest_logreport(self, report):
+        if report.when == 'teardown':
+            self.listener.test_states.finish(report.nodeid)
@@ -1,13 +1,30 @@
+import io
 import time
 import logging
+import threading
 import pytest
 import uuid
 
-from pytest_zafira.constants import PARAMETER, TEST_STATUS, CONFIG
+from pytest_zafira.constants import TEST_STATUS, CONFIG
 
-from .api import zafira_client
-from .utils import Context
-from .exceptions import ZafiraError
+from .utils import (Context,
+                    TestCaseCache,
+                    TestStateRegistry,
+                    session_upload_executor,
+                    close_session_upload_executor)
+from .utils.failure_message import FailureMessage
+from .utils.known_issues import KnownIssueIndex, failure_signature
+from .utils.metrics import metrics
+from .utils.settings import parse_options
+from .exceptions import ZafiraError, APIError, ConfigError
+from .xdist_support import (is_xdist_worker,
+                            is_xdist_controller,
+                            ZafiraXdistWorker,
+                            CI_TEST_ID_PROPERTY,
+                            START_TIME_PROPERTY,
+                            XFAIL_PROPERTY,
+                            ARTIFACT_PROPERTY,
+                            WORKER_INPUT_KEY)
 
 
 class PyTestZafiraPlugin:
@@ -20,17 +37,29 @@ class PyTestZafiraPlugin:
     user = None
     job = None
     test_suite = None
-    refresh_token = None
-    test_case = None
+    token_manager = None
     test_run = None
-    test = None
     zc = None
-    ci_test_id = None
+    test_states = TestStateRegistry()
+    reporting_queue = None
+    spool_journal = None
+    test_case_cache = None
+    registered_test_cases = None
+    batch_registration_supported = True
+    xdist_controller = False
+    session_started = None
+    known_issues = None
+    # artifacts are attached by uploading threads while tests finish
+    artifact_lock = threading.Lock()
 
     __INSTANCE = None
 
-    skip_reason = None
     MAX_LENGTH_OF_WORKITEM = 46
+    FAILURE_TRACE_ARTIFACT = 'full_trace'
+    # responses of Zafira to test started for removed test case
+    MISSING_TEST_CASE_STATUS_CODES = (400, 404)
+    # responses of Zafira without batch endpoint
+    BATCH_UNSUPPORTED_STATUS_CODES = (404, 405)
 
     logger = logging.getLogger('zafira')
 
@@ -39,53 +68,117 @@ class PyTestZafiraPlugin:
             cls.__INSTANCE = super(PyTestZafiraPlugin, cls).__new__(cls)
         return cls.__INSTANCE
 
-    @pytest.hookimpl
+    @property
+    def reporting(self):
+        """
+        :return: True if test run is registered and tests are reported
+        """
+        return self.ZAFIRA_ENABLED and self.test_run is not None
+
+    @pytest.hookimpl(tryfirst=True)
     def pytest_sessionstart(self, session):
         """
         Setup-class handler, signs in user, creates a testsuite,
         testcase, job and registers testrun in Zafira
         """
-        initialized = self.__initialize_zafira()
-        if not initialized:
-            return
-        try:
-            job_name = Context.get(PARAMETER['JOB_NAME'])
-            suite_name = Context.get(PARAMETER['SUITE_NAME'])
-            self.user = self.zc.get_user_profile().json()
-
-            self.test_suite = self.zc.create_test_suite(
-                self.user["id"],
-                suite_name,
-                'filename'
-            ).json()
+        self.session_started = time.perf_counter()
+        with metrics.timer('hook', 'pytest_sessionstart'):
+            if is_xdist_worker(session.config):
+                return
+            self.xdist_controller = is_xdist_controller(session.config)
+            initialized = self.__initialize_zafira()
+            if not initialized:
+                return
+            try:
+                job_name = Context.settings().job_name
+                suite_name = Context.settings().suite_name
+                self.user = self.zc.get_user_profile().json()
 
-            self.job = self.zc.create_job(
-                self.user["id"],
-                job_name,
-                'jenkins_url',
-                "jenkins_host"
-            ).json()
+                self.test_suite = self.zc.create_test_suite(
+                    self.user["id"],
+                    suite_name,
+                    'filename'
+                ).json()
 
-            self.test_run = self.zc.start_test_run(
-                self.job["id"],
-                self.test_suite["id"],
-                0,
-                config=CONFIG
-            ).json()
+                self.job = self.zc.create_job(
+                    self.user["id"],
+                    job_name,
+                    'jenkins_url',
+                    "jenkins_host"
+                ).json()
 
-        except ZafiraError as e:
-            self.ZAFIRA_ENABLED = False
-            self.logger.error(
-                "Undefined error during test run registration!",
-                e
-            )
+                self.test_run = self.zc.start_test_run(
+                    self.job["id"],
+                    self.test_suite["id"],
+                    0,
+                    config=CONFIG
+                ).json()
 
-        except Exception as e:
-            self.ZAFIRA_ENABLED = False
-            self.logger.error(
-                "Undefined error during pytest_sessionstart!",
-                e
-            )
+                self.registered_test_cases = {}
+                self.__initialize_test_case_cache()
+                self.__initialize_known_issues()
+
+            except ZafiraError as e:
+                self.ZAFIRA_ENABLED = False
+                self.logger.error(
+                    "Undefined error during test run registration!",
+                    e
+                )
+
+            except Exception as e:
+                self.ZAFIRA_ENABLED = False
+                self.logger.error(
+                    "Undefined error during pytest_sessionstart!",
+                    e
+                )
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, session, config, items):
+        """
+        Registers test cases of all selected tests before the first test
+        runs, so test hooks only need to start and finish tests
+        """
+        with metrics.timer('hook', 'pytest_collection_modifyitems'):
+            if not self.reporting:
+                return
+            if not Context.settings().test_case_preregistration:
+                return
+            try:
+                self.preregister_test_cases(
+                    [self.test_case_key(item) for item in items]
+                )
+            except Exception as e:
+                # tests not registered yet are registered one by one
+                # when they start
+                self.logger.error("Unable to register test cases: %s", e)
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_configure_node(self, node):
+        """
+        xdist controller handler, shares registered test run with worker
+        """
+        node.workerinput[WORKER_INPUT_KEY] = {
+            'enabled': self.reporting,
+            'test_run': self.test_run,
+            'access_token': self.zc.access_token if self.zc else None
+        }
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_xdist_node_collection_finished(self, node, ids):
+        """
+        xdist controller handler, registers test cases collected by worker
+        """
+        with metrics.timer('hook', 'pytest_xdist_node_collection_finished'):
+            if not self.reporting:
+                return
+            if not Context.settings().test_case_preregistration:
+                return
+            try:
+                self.preregister_test_cases(
+                    [self.nodeid_test_case_key(nodeid) for nodeid in ids]
+                )
+            except Exception as e:
+                self.logger.error("Unable to register test cases: %s", e)
 
     @pytest.hookimpl
     def pytest_runtest_setup(self, item):
@@ -93,80 +186,79 @@ class PyTestZafiraPlugin:
         Setup handler, set up initial parameters for test,
         attaches to testsuite, registers and starts the test
         """
-        if not self.ZAFIRA_ENABLED:
-            return
-        try:
-            test_name = item.name
-            class_name = item.nodeid.split('::')[1]
-            self.ci_test_id = str(uuid.uuid4())
+        with metrics.timer('hook', 'pytest_runtest_setup'):
+            if not self.reporting:
+                return
+            try:
+                class_name, test_name = self.test_case_key(item)
+                state = self.test_states.start(item.nodeid)
+                state.ci_test_id = str(uuid.uuid4())
 
-            package = ''
-            self.test_case = self.zc.create_test_case(
-                class_name,
-                test_name,
-                self.test_suite["id"],
-                self.user["id"]
-            ).json()
+                package = ''
+                state.test_case = self.send(self.register_test_case,
+                                            class_name,
+                                            test_name)
 
-            work_items = []
+                work_items = []
 
-            if hasattr(item._evalxfail, 'reason'):
-                work_items.append('xfail')
+                if hasattr(item._evalxfail, 'reason'):
+                    work_items.append('xfail')
 
-            self.test = self.zc.start_test(
-                self.test_run["id"],
-                self.test_case["id"],
-                test_name,
-                round(time.time() * 1000),
-                self.ci_test_id,
-                TEST_STATUS['IN_PROGRESS'],
-                class_name,
-                package,
-                work_items
-            ).json()
+                state.test = self.send(
+                    self.register_test,
+                    state.test_case,
+                    test_name,
+                    round(time.time() * 1000),
+                    state.ci_test_id,
+                    TEST_STATUS['IN_PROGRESS'],
+                    class_name,
+                    package,
+                    work_items
+                )
 
-        except ZafiraError as e:
-            self.logger.error(
-                "Undefined error during test case/method start!",
-                e
-            )
+            except ZafiraError as e:
+                self.logger.error(
+                    "Undefined error during test case/method start!",
+                    e
+                )
 
     @pytest.hookimpl
     def pytest_runtest_teardown(self, item):
         """
-        Teardown handler. Finishes test, adds workitems if needed
+        Teardown handler. Registers tests skipped by mark, test is
+        finished by teardown report
         """
-        if not self.ZAFIRA_ENABLED:
-            return
-        try:
-            if item._skipped_by_mark:
-                test_name = item.name
-                class_name = item.nodeid.split('::')[1]
-                full_path_to_file = item.nodeid.split('::')[0].split('/')
-                package = self.compose_package_name(full_path_to_file) + '/'
-                self.test_case = self.zc.create_test_case(
-                    class_name,
-                    test_name,
-                    self.test_suite['id'],
-                    self.user['id']
-                ).json()
-
-                self.test = self.zc.start_test(
-                    self.test_run['id'],
-                    self.test_case['id'],
-                    test_name,
-                    round(time.time() * 1000),
-                    self.ci_test_id,
-                    test_class=class_name,
-                    test_group=package
-                ).json()
+        with metrics.timer('hook', 'pytest_runtest_teardown'):
+            if not self.reporting:
+                return
+            try:
+                state = self.test_states.get_or_start(item.nodeid)
+                if item._skipped_by_mark:
+                    class_name, test_name = self.test_case_key(item)
+                    full_path_to_file = item.nodeid.split('::')[0].split('/')
+                    package = \
+                        self.compose_package_name(full_path_to_file) + '/'
+                    state.ci_test_id = state.ci_test_id or str(uuid.uuid4())
+                    state.test_case = self.send(self.register_test_case,
+                                                class_name,
+                                                test_name)
 
-                self.test['status'] = TEST_STATUS['SKIPPED']
-                self.add_work_item_to_test(self.test['id'], self.skip_reason)
+                    state.test = self.send(
+                        self.register_test,
+                        state.test_case,
+                        test_name,
+                        round(time.time() * 1000),
+                        state.ci_test_id,
+                        test_class=class_name,
+                        test_group=package
+                    )
 
-            self.zc.finish_test(self.test)
-        except ZafiraError as e:
-            self.logger.error('Unable to finish test run correctly', e)
+                    state.test['status'] = TEST_STATUS['SKIPPED']
+                    state.work_items.append(
+                        self.work_item_name(state.skip_reason)
+                    )
+            except ZafiraError as e:
+                self.logger.error('Unable to finish test run correctly', e)
 
     @pytest.hookimpl
     def pytest_runtest_logreport(self, report):
@@ -174,54 +266,462 @@ class PyTestZafiraPlugin:
         Set test status, stacktrace if needed
         :param report: info about test
         """
-        if not self.ZAFIRA_ENABLED:
-            return
-        try:
-            if report.when == 'setup':
-                if report.skipped:
-                    self.skip_reason = report.longrepr[2]
-                if report.failed:
-                    self.on_test_failure(self.test, report)
-            if report.when == 'call':
-                self.test['finishTime'] = round(time.time() * 1000)
-                test_result = report.outcome
-                if test_result == 'passed':
-                    self.on_test_success(self.test)
-                elif test_result == 'failed':
-                    self.on_test_failure(self.test, report)
-                else:
-                    self.on_test_skipped(self.test, report)
+        with metrics.timer('hook', 'pytest_runtest_logreport'):
+            if not self.reporting:
+                return
+            try:
+                if self.xdist_controller:
+                    self.on_worker_report(report)
+                    return
+                if report.when == 'teardown':
+                    # fixtures are torn down, nothing else will be
+                    # attached to the test
+                    self.finish_test_state(
+                        self.test_states.finish(report.nodeid)
+                    )
+                    return
+                state = self.test_states.get_or_start(report.nodeid)
+                if report.when == 'setup':
+                    if report.skipped:
+                        state.skip_reason = report.longrepr[2]
+                    if report.failed and state.test is not None:
+                        self.on_test_failure(state, report)
+                if report.when == 'call' and state.test is not None:
+                    self.on_call_report(state, report)
+            except ZafiraError as e:
+                self.logger.error("Unable to finish test correctly", e)
+
+    @pytest.hookimpl
+    def pytest_sessionfinish(self, session, exitstatus):
+        """
+        Teardown-class handler, closes the testrun
+        """
+        with metrics.timer('hook', 'pytest_sessionfinish'):
+            # screenshots and failure traces which are still uploading
+            # attach artifacts and log links through reporting queue and
+            # log handlers
+            close_session_upload_executor()
 
-                log_link = Context.get(PARAMETER['ZAFIRA_APP_URL'])
-                log_link += '/tests/runs/{}/info/{}'.format(
-                    self.test_run['id'],
-                    self.test['id']
+            if not self.reporting:
+                return
+
+            if self.reporting_queue:
+                self.reporting_queue.drain(
+                    Context.settings().reporting_drain_timeout
                 )
 
-                self.add_artifact_to_test(
-                    self.test,
-                    Context.get(PARAMETER['ARTIFACT_LOG_NAME']),
-                    log_link,
-                    Context.get(PARAMETER['ARTIFACT_EXPIRES_IN_DEFAULT_TIME']))
-        except ZafiraError as e:
-            self.logger.error("Unable to finish test correctly", e)
+            self.flush_log_handlers()
+
+            try:
+                self.zc.finish_test_run(self.test_run["id"])
+            except ZafiraError as e:
+                self.logger.error("Unable to finish test run correctly", e)
+
+            if self.token_manager:
+                self.token_manager.stop()
+            self.zc.close()
+
+            if self.spool_journal and self.spool_journal.records:
+                self.spool_journal.close()
+                self.logger.info(
+                    "Zafira calls are spooled to {}, upload them by "
+                    "zafira-replay".format(self.spool_journal.path)
+                )
+
+            if self.test_case_cache:
+                self.test_case_cache.save()
 
     @pytest.hookimpl
-    def pytest_sessionfinish(self, session, exitstatus):
+    def pytest_terminal_summary(self, terminalreporter):
         """
-        Teardown-class handler, closes the testrun
+        Reports time spent on reporting to Zafira, S3 and RabbitMQ
         """
-        if not self.ZAFIRA_ENABLED:
+        if not metrics.enabled or self.session_started is None or \
+                is_xdist_worker(terminalreporter.config):
             return
+        settings = Context.settings()
+        session_seconds = time.perf_counter() - self.session_started
+        if settings.metrics:
+            terminalreporter.write_sep('-', 'Zafira reporting time')
+            terminalreporter.write_line(
+                'session: {:.3f} s'.format(session_seconds)
+            )
+            for line in metrics.format_summary(session_seconds):
+                terminalreporter.write_line(line)
+        if settings.metrics_file:
+            metrics.write_json(settings.metrics_file, session_seconds)
 
-        try:
-            self.zc.finish_test_run(self.test_run["id"])
-        except ZafiraError as e:
-            self.logger.error("Unable to finish test run correctly", e)
+    @staticmethod
+    def flush_log_handlers():
+        """
+        Makes buffered log appenders (e.g. RabbitHandler in async mode)
+        publish everything before test run is finished
+        """
+        for logger in (logging.getLogger('zafira'), logging.getLogger()):
+            for handler in logger.handlers:
+                handler.flush()
 
     def compose_package_name(self, path_entries_list):
         return '/'.join(path_entries_list)
 
+    @staticmethod
+    def test_case_key(item):
+        """
+        :return: test class and test method names of test case in Zafira
+        """
+        return item.nodeid.split('::')[1], item.name
+
+    @staticmethod
+    def nodeid_test_case_key(nodeid):
+        """
+        Same as test_case_key, for tests which items live in xdist worker
+        """
+        path_entries = nodeid.split('::')
+        return path_entries[1], path_entries[-1]
+
+    def on_call_report(self, state, report):
+        test = state.test
+        test['finishTime'] = round(time.time() * 1000)
+        test_result = report.outcome
+        if test_result == 'passed':
+            self.on_test_success(test)
+        elif test_result == 'failed':
+            self.on_test_failure(state, report)
+        else:
+            self.on_test_skipped(state, report)
+
+        state.log_link = True
+
+    def on_worker_report(self, report):
+        """
+        Reports test executed by xdist worker. Controller only sees test
+        reports, so the whole test lifecycle is driven by them
+        """
+        if report.when == 'setup':
+            properties = dict(report.user_properties)
+            class_name, test_name = self.nodeid_test_case_key(report.nodeid)
+            state = self.test_states.start(report.nodeid, current=False)
+            state.ci_test_id = properties.get(CI_TEST_ID_PROPERTY) or \
+                str(uuid.uuid4())
+            state.test_case = self.send(self.register_test_case,
+                                        class_name,
+                                        test_name)
+            state.test = self.send(
+                self.register_test,
+                state.test_case,
+                test_name,
+                properties.get(START_TIME_PROPERTY) or
+                round(time.time() * 1000),
+                state.ci_test_id,
+                TEST_STATUS['IN_PROGRESS'],
+                class_name,
+                '',
+                ['xfail'] if properties.get(XFAIL_PROPERTY) else []
+            )
+            if report.skipped:
+                state.test['status'] = TEST_STATUS['SKIPPED']
+                state.work_items.append(
+                    self.work_item_name(report.longrepr[2])
+                )
+            if report.failed:
+                self.on_test_failure(state, report)
+            self.__add_reported_artifacts(state, report)
+        elif report.when == 'call':
+            state = self.test_states.get(report.nodeid)
+            if state is not None:
+                self.on_call_report(state, report)
+                self.__add_reported_artifacts(state, report)
+        elif report.when == 'teardown':
+            state = self.test_states.finish(report.nodeid)
+            if state is not None:
+                self.__add_reported_artifacts(state, report)
+                self.finish_test_state(state)
+
+    @staticmethod
+    def __add_reported_artifacts(state, report):
+        state.artifacts.extend(value for name, value in report.user_properties
+                               if name == ARTIFACT_PROPERTY)
+
+    def finish_test_state(self, state):
+        """
+        Sends finish of test with everything collected for it
+        :param state: TestState of test, None if test wasn't started
+        """
+        if state is None or state.test is None:
+            return
+        with self.artifact_lock:
+            state.finished = True
+            self.send(self.finish_test,
+                      state.test,
+                      list(state.artifacts),
+                      list(state.work_items),
+                      state.log_link)
+
+    def finish_test(self, test, artifacts=(), work_items=(), log_link=False):
+        """
+        Finishes test by a single request, its artifacts and work items
+        are embedded into finished test
+        :param artifacts: (name, link, expires in) of artifacts
+        :param work_items: names of work items
+        :param log_link: add link to test logs in Zafira to artifacts
+        """
+        from .api.payloads import TestArtifact
+
+        if self.is_dropped(test):
+            return
+        artifacts = list(artifacts)
+        if log_link:
+            settings = Context.settings()
+            artifacts.insert(0, (settings.artifact_log_name,
+                                 self.get_log_link(test),
+                                 settings.artifact_expires_in_default_time))
+        if artifacts:
+            test['artifacts'] = [
+                TestArtifact(testId=test['id'],
+                             link=link,
+                             name=name,
+                             expiresIn=expires_in).to_dict()
+                for name, link, expires_in in artifacts
+            ]
+        if work_items:
+            test['workItems'] = \
+                list(test.get('workItems') or []) + list(work_items)
+        self.zc.finish_test(test)
+
+    def send(self, func, *args, **kwargs):
+        """
+        Calls func right away in sync reporting mode, otherwise
+        enqueues it to the background reporting queue
+        :return: value returned by func or LazyResult for queued call
+        """
+        if self.reporting_queue:
+            return self.reporting_queue.submit(func, *args, **kwargs)
+        return func(*args, **kwargs)
+
+    def register_test_case(self, class_name, test_name, use_cache=True):
+        """
+        Returns test case from cache if it's known, otherwise
+        registers it in Zafira
+        """
+        if use_cache:
+            test_case = self.registered_test_cases.get(
+                (class_name, test_name)
+            )
+            if test_case:
+                return test_case
+
+        if self.test_case_cache and use_cache:
+            test_case_id = self.test_case_cache.get(class_name, test_name)
+            if test_case_id is not None:
+                return {
+                    'id': test_case_id,
+                    'testClass': class_name,
+                    'testMethod': test_name,
+                    'testSuiteId': self.test_suite["id"],
+                    'cached': True
+                }
+
+        test_case = self.zc.create_test_case(
+            class_name,
+            test_name,
+            self.test_suite["id"],
+            self.user["id"]
+        ).json()
+
+        from .api.spool import is_placeholder_id
+        if self.test_case_cache and not is_placeholder_id(test_case["id"]):
+            self.test_case_cache.put(class_name, test_name, test_case["id"])
+        return test_case
+
+    def register_test(self, test_case, test_name, start_time, ci_test_id,
+                      status=TEST_STATUS['IN_PROGRESS'], test_class=None,
+                      test_group=None, work_items=None):
+        if self.is_dropped(test_case):
+            # registered while Zafira was unavailable
+            test_case = self.register_test_case(test_case['testClass'],
+                                                test_case['testMethod'],
+                                                use_cache=False)
+        try:
+            return self.zc.start_test(
+                self.test_run["id"],
+                test_case["id"],
+                test_name,
+                start_time,
+                ci_test_id,
+                status,
+                test_class,
+                test_group,
+                work_items
+            ).json()
+        except APIError as e:
+            # start_test isn't idempotent, only rejection of missing test
+            # case is safe to repeat
+            if not test_case.get('cached') or \
+                    e.status_code not in self.MISSING_TEST_CASE_STATUS_CODES:
+                raise
+            # cached test case might be removed from Zafira
+            self.test_case_cache.invalidate(test_case['testClass'],
+                                            test_case['testMethod'])
+            test_case = self.register_test_case(test_case['testClass'],
+                                                test_case['testMethod'],
+                                                use_cache=False)
+            return self.register_test(test_case, test_name, start_time,
+                                      ci_test_id, status, test_class,
+                                      test_group, work_items)
+
+    def preregister_test_cases(self, keys):
+        """
+        Registers test cases which are not cached yet by batches. Falls back
+        to limited number of parallel single requests if Zafira has no
+        batch endpoint
+        :param keys: list of (test class, test method) pairs
+        """
+        new_keys = []
+        for key in keys:
+            if key in self.registered_test_cases or key in new_keys:
+                continue
+            if self.test_case_cache and self.test_case_cache.get(*key):
+                continue
+            new_keys.append(key)
+
+        batch_size = Context.settings().test_case_batch_size
+        concurrency = Context.settings().test_case_registration_concurrency
+        for i in range(0, len(new_keys), batch_size):
+            batch = [
+                self.zc.build_test_case(test_class,
+                                        test_method,
+                                        self.test_suite["id"],
+                                        self.user["id"])
+                for test_class, test_method in new_keys[i:i + batch_size]
+            ]
+            for test_case in self.__register_batch(batch, concurrency):
+                self.__remember_test_case(test_case)
+
+    def __register_batch(self, batch, concurrency):
+        if self.batch_registration_supported:
+            try:
+                return self.zc.create_test_cases(batch).json()
+            except APIError as e:
+                if e.status_code not in self.BATCH_UNSUPPORTED_STATUS_CODES:
+                    raise
+                self.logger.debug(
+                    "Batch registration of test cases is unavailable: %s", e
+                )
+                self.batch_registration_supported = False
+
+        return [
+            response.json() for response in
+            self.zc.create_test_cases_concurrently(batch, concurrency)
+        ]
+
+    def __remember_test_case(self, test_case):
+        from .api.spool import is_placeholder_id
+        if self.is_dropped(test_case):
+            # it's registered again when test starts
+            return
+        key = (test_case['testClass'], test_case['testMethod'])
+        self.registered_test_cases[key] = test_case
+        if self.test_case_cache and not is_placeholder_id(test_case['id']):
+            self.test_case_cache.put(test_case['testClass'],
+                                     test_case['testMethod'],
+                                     test_case['id'])
+
+    def prefetch_test_cases(self):
+        """
+        Warms up empty test case cache with all test cases of the suite
+        by a single request
+        """
+        try:
+            found = self.zc.search_test_cases(self.test_suite["id"]).json()
+        except ZafiraError as e:
+            self.logger.debug("Unable to prefetch test cases: %s", e)
+            return
+
+        for test_case in found.get('results') or []:
+            self.test_case_cache.put(test_case['testClass'],
+                                     test_case['testMethod'],
+                                     test_case['id'])
+
+    def is_dropped(self, entity):
+        """
+        :param entity: test or test case
+        :return: True if entity was created by a call dropped while Zafira
+                 was unavailable, so Zafira doesn't know its placeholder id
+        """
+        from .api.spool import is_dropped_id
+        if is_dropped_id(entity['id']):
+            self.logger.debug(
+                "{} is not registered in Zafira, its call is skipped".format(
+                    entity['id']
+                )
+            )
+            return True
+        return False
+
+    def get_log_link(self, test):
+        return Context.settings().zafira_app_url + \
+            '/tests/runs/{}/info/{}'.format(self.test_run['id'], test['id'])
+
+    def add_log_link_to_test(self, test):
+        settings = Context.settings()
+        self.add_artifact_to_test(
+            test,
+            settings.artifact_log_name,
+            self.get_log_link(test),
+            settings.artifact_expires_in_default_time)
+
+    def attach_artifact(self,
+                        artifact_name,
+                        artifact_link,
+                        expires_in=None,
+                        nodeid=None):
+        """
+        Adds artifact to running test. Artifact is sent with finished
+        test, under xdist it's passed to controller with the test report
+        :param nodeid: nodeid of test, test running in current thread
+                       by default
+        :return: False if there is no running test
+        """
+        if nodeid:
+            state = self.test_states.get(nodeid)
+        else:
+            state = self.test_states.current()
+        if state is None:
+            self.logger.warning(
+                "Artifact {} is not attached: test is not running".format(
+                    artifact_name
+                )
+            )
+            return False
+        self.add_artifact_to_state(state,
+                                   artifact_name,
+                                   artifact_link,
+                                   expires_in)
+        return True
+
+    def add_artifact_to_state(self,
+                              state,
+                              artifact_name,
+                              artifact_link,
+                              expires_in=None):
+        """
+        Adds artifact to finish of the test, or sends it separately if
+        the test is finished already
+        :param state: TestState of test
+        """
+        with self.artifact_lock:
+            if state.test is None or not state.finished:
+                state.artifacts.append(
+                    (artifact_name, artifact_link, expires_in)
+                )
+                return
+        if self.reporting:
+            self.send(self.add_artifact_to_test,
+                      state.test,
+                      artifact_name,
+                      artifact_link,
+                      expires_in)
+
     def add_artifact_to_test(self,
                              test,
                              artifact_name,
@@ -230,6 +730,8 @@ class PyTestZafiraPlugin:
         """
         Adds test artifact to test
         """
+        if self.is_dropped(test):
+            return
         try:
             self.zc.add_test_artifact_to_test(
                 test["id"],
@@ -240,23 +742,116 @@ class PyTestZafiraPlugin:
         except ZafiraError as e:
             self.logger.error("Unable to add artifact to test correctly", e)
 
+    def __initialize_test_case_cache(self):
+        settings = Context.settings()
+        if not settings.test_case_cache:
+            return
+        from .api import SpoolClient
+        if isinstance(self.zc, SpoolClient):
+            # spooled test cases have no ids yet
+            return
+        self.test_case_cache = TestCaseCache(
+            settings.test_case_cache_file,
+            settings.service_url,
+            settings.test_case_cache_size
+        ).load()
+        self.test_case_cache.bind(self.test_suite["id"])
+        if self.test_case_cache.is_cold():
+            self.prefetch_test_cases()
+
+    def __initialize_known_issues(self):
+        settings = Context.settings()
+        if not settings.known_issues_file and \
+                not settings.known_issues_endpoint:
+            return
+        from .api import SpoolClient
+        self.known_issues = KnownIssueIndex()
+        if settings.known_issues_file:
+            try:
+                self.known_issues.load_file(settings.known_issues_file)
+            except (ConfigError, ValueError) as e:
+                self.logger.error(
+                    "Unable to load known issues: {}".format(e)
+                )
+        # spooled calls have no responses until replay
+        if settings.known_issues_endpoint and \
+                not isinstance(self.zc, SpoolClient):
+            try:
+                self.known_issues.add_all(self.zc.get_known_issues(
+                    settings.known_issues_endpoint
+                ).json())
+            except (ZafiraError, ValueError) as e:
+                self.logger.error(
+                    "Unable to get known issues from Zafira: {}".format(e)
+                )
+        self.logger.debug(
+            "{} known issues are loaded".format(len(self.known_issues))
+        )
+
     def __initialize_zafira(self):
         enabled = False
         try:
-            ZAFIRA_ENABLED = Context.get(PARAMETER['ZAFIRA_ENABLED'])
-            self.ZAFIRA_ENABLED = ZAFIRA_ENABLED == 'True'
-            self.ZAFIRA_ACCESS_TOKEN = Context.get(PARAMETER['ACCESS_TOKEN'])
+            settings = Context.settings()
+            self.ZAFIRA_ENABLED = settings.zafira_enabled
+            self.ZAFIRA_ACCESS_TOKEN = settings.access_token
 
             if self.ZAFIRA_ENABLED:
+                # clients are imported only when reporting is enabled,
+                # so disabled plugin doesn't load HTTP libraries
+                from .api import zafira_client, ReportingQueue, SpoolClient
+                from .api.spool import SpoolRequest
+
+                reporting_mode = settings.reporting_mode
+                spool_on_unavailable = settings.spool_on_unavailable
+                if reporting_mode == 'spool':
+                    self.zc = SpoolClient(self.__create_journal())
+                elif settings.http_client == 'aiohttp':
+                    from .api import AsyncZafiraClient, AsyncClientBridge
+                    self.zc = AsyncClientBridge(AsyncZafiraClient())
+                else:
+                    self.zc = zafira_client
+                self.ZAFIRA_ENABLED = self.__is_zafira_available()
+
+                if not self.ZAFIRA_ENABLED and spool_on_unavailable:
+                    self.logger.warning(
+                        "Zafira is unavailable, calls are spooled"
+                    )
+                    self.zc = SpoolClient(self.__create_journal())
+                    self.ZAFIRA_ENABLED = True
+                elif self.ZAFIRA_ENABLED and \
+                        not isinstance(self.zc, SpoolClient):
+                    # calls made while circuit breaker is open are
+                    # spooled or dropped, so tests never wait for Zafira
+                    if spool_on_unavailable:
+                        self.zc.api.use_fallback(
+                            SpoolRequest(self.__create_journal()),
+                            permanent=True
+                        )
+                    else:
+                        self.zc.api.use_fallback(SpoolRequest())
 
-                self.zc = zafira_client
-                self.ZAFIRA_ENABLED = self.zc.is_zafira_available()
+                if self.ZAFIRA_ENABLED and \
+                        not isinstance(self.zc, SpoolClient) and \
+                        not self.__start_token_manager(settings):
+                    if spool_on_unavailable:
+                        self.logger.warning(
+                            "Unable to sign in to Zafira, calls are spooled"
+                        )
+                        self.zc = SpoolClient(
+                            self.spool_journal or self.__create_journal()
+                        )
+                    else:
+                        self.ZAFIRA_ENABLED = False
 
                 if self.ZAFIRA_ENABLED:
-                    self.refresh_token = self.zc.refresh_token(
-                        self.ZAFIRA_ACCESS_TOKEN
-                    ).json()
-                    self.zc.access_token = self.refresh_token['accessToken']
+                    # under xdist controller is the single uploader for
+                    # all workers, so it never blocks on Zafira. Spooled
+                    # calls never block
+                    if not isinstance(self.zc, SpoolClient) and (
+                            reporting_mode == 'async' or
+                            self.xdist_controller):
+                        self.reporting_queue = ReportingQueue()
+                        self.reporting_queue.start()
                     if self.ZAFIRA_ENABLED:
                         is_available = "available"
                     else:
@@ -266,42 +861,232 @@ class PyTestZafiraPlugin:
             enabled = self.ZAFIRA_ENABLED
         except ZafiraError as e:
             self.logger.error("Unable to find config property: ", e)
+        except Exception as e:
+            self.logger.error("Unable to initialize Zafira: %s", e)
+        if not enabled:
+            self.ZAFIRA_ENABLED = False
         return enabled
 
+    def __start_token_manager(self, settings):
+        """
+        Signs in to Zafira and keeps the token valid
+        :return: False if Zafira rejected the access token
+        """
+        from .api import TokenManager
+        token_manager = TokenManager(
+            self.zc,
+            self.ZAFIRA_ACCESS_TOKEN,
+            settings.token_cache_file if settings.token_cache else None,
+            settings.token_refresh_margin,
+            settings.service_url
+        )
+        try:
+            token_manager.start()
+        except ZafiraError as e:
+            self.logger.error("Unable to sign in to Zafira: %s", e)
+            return False
+        self.token_manager = token_manager
+        self.zc.api.use_authenticator(self.token_manager.reauthorize)
+        return True
+
+    def __is_zafira_available(self):
+        try:
+            return self.zc.is_zafira_available()
+        except Exception as e:
+            self.logger.error("Unable to reach Zafira: %s", e)
+            return False
+
+    def __create_journal(self):
+        from .api import Journal
+        settings = Context.settings()
+        self.spool_journal = Journal(
+            settings.spool_file,
+            settings.spool_fsync,
+            settings.spool_fsync_interval
+        )
+        return self.spool_journal
+
     @staticmethod
     def on_test_success(test):
         test['status'] = TEST_STATUS['PASSED']
 
-    @staticmethod
-    def on_test_failure(test, report):
+    def on_test_failure(self, state, report):
+        test = state.test
         test['status'] = TEST_STATUS['FAILED']
-        test['message'] = report.longreprtext
+        signature = self.set_message(state, report)
+        issue = self.known_issues.match(signature) \
+            if self.known_issues else None
+        if issue is not None:
+            test['knownIssue'] = True
+            test['blocker'] = issue.blocker
+            state.work_items.append(issue.work_item)
 
-    @staticmethod
-    def on_test_skipped(test, report):
-        test['message'] = report.longreprtext
+    def on_test_skipped(self, state, report):
+        test = state.test
+        self.set_message(state, report)
         if not hasattr(report, 'wasxfail'):
             test['status'] = TEST_STATUS['SKIPPED']
         else:
             test['status'] = TEST_STATUS['FAILED']
 
+    def set_message(self, state, report):
+        """
+        Sets test message to text of report, cut to configured length, and
+        its hash code. Complete text of longer report is attached to the
+        test as gzip compressed artifact if trace upload is enabled
+        :param state: TestState of test
+        :return: signature of failure, see failure_signature
+        """
+        settings = Context.settings()
+        message = FailureMessage.render(
+            report,
+            settings.failure_message_max_length,
+            settings.failure_message_tail_length,
+            settings.failure_trace_upload
+        )
+        note = None
+        if message.truncated and settings.failure_trace_upload:
+            note = self.upload_failure_trace(state,
+                                             report,
+                                             message.compressed())
+        text = message.text(note)
+        test = state.test
+        test['message'] = text
+        test['messageHashCode'] = failure_signature(text)
+        return test['messageHashCode']
+
+    def upload_failure_trace(self, state, report, trace):
+        """
+        Schedules upload of complete text of report, it's attached to the
+        test when uploaded
+        :param trace: gzip compressed text of report
+        :return: note about uploaded text for test message, None if upload
+                 is dropped
+        """
+        future = session_upload_executor().submit(
+            self.__upload_failure_trace,
+            state,
+            '{}_trace.txt.gz'.format(report.when),
+            trace
+        )
+        if future is None:
+            return None
+        return 'complete text is attached as {}'.format(
+            self.FAILURE_TRACE_ARTIFACT
+        )
+
+    def __upload_failure_trace(self, state, filename, trace):
+        from .utils.artifact import Artifact
+
+        try:
+            url, expires_in = Artifact.store(
+                io.BytesIO(trace),
+                self.FAILURE_TRACE_ARTIFACT,
+                state.ci_test_id,
+                content_type='text/plain; charset=utf-8',
+                filename=filename,
+                content_encoding='gzip'
+            )
+        except Exception as e:
+            self.logger.error(
+                "Unable to upload complete failure message: {}".format(e)
+            )
+            return
+        self.add_artifact_to_state(state,
+                                   self.FAILURE_TRACE_ARTIFACT,
+                                   url,
+                                   expires_in)
+
     def get_ci_run_id(self):
         return self.test_run['ciRunId']
 
+    @property
+    def ci_test_id(self):
+        """
+        :return: ciTestId of test running in current thread
+        """
+        state = self.test_states.current()
+        return state.ci_test_id if state else None
+
+    @property
+    def test(self):
+        state = self.test_states.current()
+        return state.test if state else None
+
+    @property
+    def test_case(self):
+        state = self.test_states.current()
+        return state.test_case if state else None
+
+    def get_ci_test_id(self, nodeid):
+        """
+        :return: ciTestId of running test by its nodeid
+        """
+        state = self.test_states.get(nodeid)
+        return state.ci_test_id if state else self.ci_test_id
+
+    def work_item_name(self, work_item):
+        """
+        :return: work item, or 'Skipped' if it's too long for Zafira
+        """
+        if len(work_item) < self.MAX_LENGTH_OF_WORKITEM:
+            return work_item
+        return 'Skipped'
+
     def add_work_item_to_test(self, test_id, work_item):
-        if not self.ZAFIRA_ENABLED:
+        from .api.spool import is_dropped_id
+        if not self.ZAFIRA_ENABLED or is_dropped_id(test_id):
             return
         try:
-            work_items = list()
-            lenght_check = len(work_item) < self.MAX_LENGTH_OF_WORKITEM
-            work_items.append(work_item if lenght_check else 'Skipped')
-            self.zc.create_test_work_items(test_id, work_items)
+            self.zc.create_test_work_items(test_id,
+                                           [self.work_item_name(work_item)])
         except ZafiraError as e:
             self.logger.error("Unable to add work item: ", e)
 
 
+def pytest_addoption(parser):
+    group = parser.getgroup('zafira')
+    group.addoption(
+        '--zafira-config',
+        dest='zafira_config',
+        default=None,
+        help='path to Zafira properties file, zafira_properties.ini in '
+             'working directory by default'
+    )
+    group.addoption(
+        '--zafira-option',
+        dest='zafira_options',
+        action='append',
+        default=[],
+        metavar='NAME=VALUE',
+        help='override option of Zafira properties file, e.g. '
+             'reporting_mode=async'
+    )
+    parser.addini(
+        'zafira_options',
+        type='linelist',
+        default=[],
+        help='Zafira options as NAME=VALUE lines, override properties file'
+    )
+
+
 def pytest_configure(config):
     """
-    Attaches wrapped hooks as plugin
+    Parses Zafira configuration and attaches wrapped hooks as plugin
     """
-    config.pluginmanager.register(PyTestZafiraPlugin())
+    try:
+        Context.configure(
+            config.getoption('zafira_config'),
+            parse_options(config.getini('zafira_options')),
+            parse_options(config.getoption('zafira_options'))
+        )
+    except ConfigError as e:
+        raise pytest.UsageError(str(e))
+    settings = Context.settings()
+    metrics.enabled = settings.metrics or bool(settings.metrics_file)
+    listener = PyTestZafiraPlugin()
+    config.pluginmanager.register(listener)
+    if is_xdist_worker(config):
+        config.pluginmanager.register(
+            ZafiraXdistWorker(listener, config.workerinput)
+        )
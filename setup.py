@@ -50,6 +50,10 @@ setup(
         'six==1.11.0',
         'urllib3==1.23',
     ],
+    extras_require={
+        'images': ['Pillow'],
+        'async': ['aiohttp'],
+    },
     keywords=['pytest', 'zafira'],
     classifiers=[
         'Development Status :: 5 - Production/Stable',
@@ -72,5 +76,8 @@ setup(
         'pytest11': [
             'zafira = pytest_zafira',
         ],
+        'console_scripts': [
+            'zafira-replay = pytest_zafira.replay:main',
+        ],
     },
 )